@@ -9,6 +9,7 @@ from tools import (
     download_x_profile_picture,
     generate_video_from_image,
 )
+from tools.meme_assets import CLASSIC_MEMES
 from utils import build_prompt_from_tweet
 
 
@@ -20,15 +21,8 @@ class MediaResult(BaseModel):
 
 def create_image_generation_agent():
     """Create and return a configured image generation agent."""
-    classic_memes = {
-        "hosico": "@Hosico_on_sol",
-        "200m": "@the200m_bonk",
-        "crybaby": "@Crybaby_on_sol",
-        "bonk": "@bonk_inu",
-    }
-
     classic_meme_info = "\n".join(
-        [f"- {key}: twitter handle {value}" for key, value in classic_memes.items()]
+        [f"- {key}: twitter handle {value}" for key, value in CLASSIC_MEMES.items()]
     )
 
     print(f"background info:\n{classic_meme_info}")
@@ -0,0 +1,321 @@
+"""
+Async counterparts of the models in models.py, built on AsyncMongoClient.
+
+They share their documents and queries with the sync models so both write the
+same schema; use these from coroutines and the sync models from scripts.
+"""
+
+from datetime import datetime
+from typing import Any
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from .connection import get_async_db
+from .models import (
+    PENDING_JOB_STATUSES,
+    _bot_stats,
+    _checkpoint_update,
+    _claim_update,
+    _exhausted_filter,
+    _finish_update,
+    _increment_processed_update,
+    _job_upserts,
+    _mention_doc,
+    _processing_upserts,
+    _requeue_update,
+    _result_update,
+    _stale_processing_filter,
+    _upserted_indexes,
+)
+
+
+class AsyncProcessedMention:
+    """Async model for tracking processed mentions"""
+
+    @property
+    def collection(self) -> AsyncCollection[dict[str, Any]]:
+        return get_async_db().processed_mentions
+
+    async def mark_as_processed(
+        self,
+        mention_id: str,
+        username: str,
+        tweet_text: str,
+        image_path: str | None = None,
+        author_id: str | None = None,
+    ) -> bool:
+        """Mark a mention as processed"""
+        try:
+            doc = _mention_doc(mention_id, username, tweet_text, image_path, author_id)
+            status = doc["status"]
+
+            result = await self.collection.insert_one(doc)
+            print(f"Marked mention {mention_id} with status '{status}' in database")
+            return result.acknowledged
+
+        except DuplicateKeyError:
+            print(f"Mention {mention_id} is already recorded in database")
+            return False
+        except Exception as e:
+            print(f"Error marking mention as processed: {e}")
+            return False
+
+    async def is_processed(self, mention_id: str) -> bool:
+        """Check if a mention has already been processed"""
+        try:
+            doc = await self.collection.find_one(
+                {"mention_id": mention_id}, {"_id": 0, "mention_id": 1}
+            )
+            return doc is not None
+        except Exception as e:
+            print(f"Error checking if mention is processed: {e}")
+            return False
+
+    async def get_processed_ids(self, mention_ids: list[str]) -> set[str]:
+        """Get the subset of mention IDs that have already been processed"""
+        if not mention_ids:
+            return set()
+        try:
+            cursor = self.collection.find(
+                {"mention_id": {"$in": list(mention_ids)}}, {"_id": 0, "mention_id": 1}
+            )
+            return {doc["mention_id"] async for doc in cursor}
+        except Exception as e:
+            print(f"Error checking processed mentions: {e}")
+            return set()
+
+    async def mark_many_as_processing(self, mentions: list[dict[str, Any]]) -> set[str]:
+        """
+        Record a batch of mentions as processing, returning the IDs recorded.
+
+        Raises:
+            PyMongoError: If the batch could not be written
+        """
+        if not mentions:
+            return set()
+
+        try:
+            result = await self.collection.bulk_write(
+                _processing_upserts(mentions), ordered=False
+            )
+            upserted = list(result.upserted_ids or {})
+        except BulkWriteError as e:
+            upserted = _upserted_indexes(e)
+
+        recorded = {mentions[index]["mention_id"] for index in upserted}
+        print(f"Marked {len(recorded)} mentions with status 'processing' in database")
+        return recorded
+
+    async def get_stale_processing(
+        self, lease_seconds: float, limit: int = 50, skip: int = 0
+    ) -> list[dict[str, Any]]:
+        """Get a page of mentions stuck in 'processing' past the lease, oldest first"""
+        try:
+            cursor = (
+                self.collection.find(_stale_processing_filter(lease_seconds))
+                .sort([("processed_at", ASCENDING), ("_id", ASCENDING)])
+                .skip(skip)
+                .limit(limit)
+            )
+            return await cursor.to_list()
+        except Exception as e:
+            print(f"Error getting stale processing mentions: {e}")
+            return []
+
+    async def set_result(self, mention_id: str, image_path: str | None) -> bool:
+        """Record the final media path of a mention (None if generation failed)"""
+        try:
+            result = await self.collection.update_one(
+                {"mention_id": mention_id}, _result_update(image_path)
+            )
+            return result.acknowledged
+        except Exception as e:
+            print(f"Error updating processed mention {mention_id}: {e}")
+            return False
+
+    async def get_processed_mentions(self, limit: int = 100) -> list[dict[str, Any]]:
+        """Get recent processed mentions"""
+        try:
+            cursor = self.collection.find().sort("processed_at", -1).limit(limit)
+            return await cursor.to_list()
+        except Exception as e:
+            print(f"Error getting processed mentions: {e}")
+            return []
+
+
+class AsyncBotState:
+    """Async model for tracking bot state and configuration"""
+
+    def __init__(self):
+        self._state_doc_id = "twitter_bot_state"
+
+    @property
+    def collection(self) -> AsyncCollection[dict[str, Any]]:
+        return get_async_db().bot_state
+
+    async def get_last_mention_id(self) -> str | None:
+        """Get the last processed mention ID"""
+        try:
+            doc = await self.collection.find_one({"_id": self._state_doc_id})
+            return doc.get("last_mention_id") if doc else None
+        except Exception as e:
+            print(f"Error getting last mention ID: {e}")
+            return None
+
+    async def set_last_mention_id(self, mention_id: str) -> bool:
+        """Set the last processed mention ID"""
+        try:
+            result = await self.collection.update_one(
+                {"_id": self._state_doc_id},
+                _checkpoint_update(mention_id),
+                upsert=True,  # Create if doesn't exist
+            )
+            return result.acknowledged
+
+        except Exception as e:
+            print(f"Error setting last mention ID: {e}")
+            return False
+
+    async def get_bot_stats(self) -> dict[str, Any]:
+        """Get bot statistics"""
+        try:
+            return _bot_stats(
+                await self.collection.find_one({"_id": self._state_doc_id})
+            )
+        except Exception as e:
+            print(f"Error getting bot stats: {e}")
+            return {}
+
+    async def increment_processed_count(self) -> bool:
+        """Increment the count of processed mentions"""
+        try:
+            result = await self.collection.update_one(
+                {"_id": self._state_doc_id}, _increment_processed_update(), upsert=True
+            )
+            return result.acknowledged
+
+        except Exception as e:
+            print(f"Error incrementing processed count: {e}")
+            return False
+
+
+class AsyncGenerationJob:
+    """Async model for the persistent queue of media generation jobs"""
+
+    def __init__(self, collection_name: str = "generation_jobs"):
+        self._collection_name = collection_name
+
+    @property
+    def collection(self) -> AsyncCollection[dict[str, Any]]:
+        return get_async_db()[self._collection_name]
+
+    async def enqueue(
+        self,
+        mention_id: str,
+        author_id: str | None,
+        username: str,
+        tweet_text: str,
+        created_at: datetime | None = None,
+    ) -> bool:
+        """Queue a generation job for a mention (no-op if already queued)"""
+        return await self.enqueue_many(
+            [
+                {
+                    "mention_id": mention_id,
+                    "author_id": author_id,
+                    "username": username,
+                    "tweet_text": tweet_text,
+                    "created_at": created_at,
+                }
+            ]
+        )
+
+    async def enqueue_many(self, jobs: list[dict[str, Any]]) -> bool:
+        """Queue generation jobs for a batch of mentions in one bulk write"""
+        if not jobs:
+            return True
+
+        try:
+            result = await self.collection.bulk_write(_job_upserts(jobs), ordered=False)
+            return result.acknowledged
+        except BulkWriteError:
+            # Jobs that lost an insert race were queued by someone else
+            return True
+        except Exception as e:
+            print(f"Error enqueuing generation jobs: {e}")
+            return False
+
+    async def claim_next(self) -> dict[str, Any] | None:
+        """Atomically move the oldest queued job to running and return it"""
+        try:
+            return await self.collection.find_one_and_update(
+                {"status": "queued"},
+                _claim_update(),
+                sort=[("created_at", ASCENDING)],
+                return_document=ReturnDocument.AFTER,
+            )
+        except Exception as e:
+            print(f"Error claiming generation job: {e}")
+            return None
+
+    async def mark_done(self, mention_id: str, media_path: str) -> bool:
+        """Mark a job as done with the path of the generated media"""
+        return await self._finish(mention_id, "done", {"media_path": media_path})
+
+    async def mark_failed(self, mention_id: str, error: str | None = None) -> bool:
+        """Mark a job as failed"""
+        return await self._finish(mention_id, "failed", {"error": error})
+
+    async def count_pending(self) -> int:
+        """Count jobs that are queued or running"""
+        try:
+            return await self.collection.count_documents(
+                {"status": {"$in": PENDING_JOB_STATUSES}}
+            )
+        except Exception as e:
+            print(f"Error counting pending generation jobs: {e}")
+            return 0
+
+    async def fail_exhausted(self, max_attempts: int) -> list[str]:
+        """Fail jobs left running after max_attempts claims; returns their mention IDs"""
+        try:
+            cursor = self.collection.find(
+                _exhausted_filter(max_attempts), {"_id": 0, "mention_id": 1}
+            )
+            mention_ids = [doc["mention_id"] for doc in await cursor.to_list()]
+            if mention_ids:
+                await self.collection.update_many(
+                    {"mention_id": {"$in": mention_ids}, "status": "running"},
+                    _finish_update(
+                        "failed", {"error": f"Gave up after {max_attempts} attempts"}
+                    ),
+                )
+            return mention_ids
+        except Exception as e:
+            print(f"Error failing exhausted generation jobs: {e}")
+            return []
+
+    async def requeue_running(self) -> int:
+        """Move jobs left running by a previous process back to the queue"""
+        try:
+            result = await self.collection.update_many(
+                {"status": "running"}, _requeue_update()
+            )
+            return result.modified_count
+        except Exception as e:
+            print(f"Error requeuing running generation jobs: {e}")
+            return 0
+
+    async def _finish(
+        self, mention_id: str, status: str, fields: dict[str, Any]
+    ) -> bool:
+        try:
+            result = await self.collection.update_one(
+                {"mention_id": mention_id}, _finish_update(status, fields)
+            )
+            return result.acknowledged
+        except Exception as e:
+            print(f"Error marking generation job as {status}: {e}")
+            return False
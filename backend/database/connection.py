@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
+from typing import Any
 
 from dotenv import load_dotenv
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient, MongoClient
+from pymongo.asynchronous.database import AsyncDatabase
 from pymongo.database import Database
 
 load_dotenv()
@@ -12,10 +15,45 @@ load_dotenv()
 logger = logging.getLogger(__name__)
 
 
+def _get_mongodb_uri() -> str:
+    mongodb_uri = os.getenv("MONGODB_URI")
+    if not mongodb_uri:
+        raise ValueError("MONGODB_URI not found in environment variables")
+    return mongodb_uri
+
+
+def _get_database_name() -> str:
+    # Select database name based on environment
+    environment = os.getenv("ENVIRONMENT", "dev").lower()
+    if environment == "production":
+        return "twitter_bot_prod"
+    return "twitter_bot_dev"
+
+
+def get_client_options() -> dict[str, Any]:
+    """
+    Get the connection pool and timeout settings shared by the sync and async clients.
+
+    MONGODB_MAX_POOL_SIZE (default 100), MONGODB_SERVER_SELECTION_TIMEOUT_MS
+    (default 30000) and MONGODB_SOCKET_TIMEOUT_MS (default: no timeout) map to
+    the driver options of the same name.
+    """
+    options: dict[str, Any] = {
+        "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", "100")),
+        "serverSelectionTimeoutMS": int(
+            os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "30000")
+        ),
+    }
+    socket_timeout = os.getenv("MONGODB_SOCKET_TIMEOUT_MS")
+    if socket_timeout:
+        options["socketTimeoutMS"] = int(socket_timeout)
+    return options
+
+
 class DatabaseConnection:
     _instance: DatabaseConnection | None = None
-    _client: MongoClient | None = None
-    _db: Database | None = None
+    _client: MongoClient[dict[str, Any]] | None = None
+    _db: Database[dict[str, Any]] | None = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -26,37 +64,28 @@ class DatabaseConnection:
         if self._client is None:
             self.connect()
 
-    def connect(self):
+    def connect(self) -> Database[dict[str, Any]]:
         """Establish connection to MongoDB"""
         try:
-            mongodb_uri = os.getenv("MONGODB_URI")
-            if not mongodb_uri:
-                raise ValueError("MONGODB_URI not found in environment variables")
-
-            self._client = MongoClient(mongodb_uri)
+            self._client = MongoClient(_get_mongodb_uri(), **get_client_options())
             # Test the connection
             self._client.admin.command("ping")
 
-            # Select database name based on environment
-            environment = os.getenv("ENVIRONMENT", "dev").lower()
-            if environment == "production":
-                db_name = "twitter_bot_prod"
-            else:
-                db_name = "twitter_bot_dev"
-
+            db_name = _get_database_name()
             self._db = self._client[db_name]
 
             logger.info(f"Successfully connected to MongoDB database: {db_name}")
             print(f"Successfully connected to MongoDB database: {db_name}")
+            return self._db
 
         except Exception as e:
             print(f"Failed to connect to MongoDB: {e}")
             raise
 
-    def get_database(self) -> Database:
+    def get_database(self) -> Database[dict[str, Any]]:
         """Get the database instance"""
         if self._db is None:
-            self.connect()
+            return self.connect()
         return self._db
 
     def close(self):
@@ -72,6 +101,76 @@ class DatabaseConnection:
 db_connection = DatabaseConnection()
 
 
-def get_db() -> Database:
+def get_db() -> Database[dict[str, Any]]:
     """Get database instance - convenience function"""
     return db_connection.get_database()
+
+
+class AsyncDatabaseConnection:
+    """
+    Lazily created AsyncMongoClient for use from coroutines.
+
+    The client is bound to the event loop it is first used on, so a new client is
+    created when called from a different loop (e.g. one loop per test), and the
+    previous one is closed in the background.
+    """
+
+    def __init__(self):
+        self._client: AsyncMongoClient[dict[str, Any]] | None = None
+        self._db: AsyncDatabase[dict[str, Any]] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._closing: set[asyncio.Future[None]] = set()
+
+    def get_database(self) -> AsyncDatabase[dict[str, Any]]:
+        """Get the async database instance for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._db is None or self._loop is not loop:
+            if self._client is not None:
+                self._close_in_background(self._client, self._loop)
+            self._client = AsyncMongoClient(_get_mongodb_uri(), **get_client_options())
+            self._db = self._client[_get_database_name()]
+            self._loop = loop
+        return self._db
+
+    async def close(self):
+        """Close the async database connection"""
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+        if self._client:
+            await self._client.close()
+            self._client = None
+            self._db = None
+            self._loop = None
+
+    def _close_in_background(
+        self,
+        client: AsyncMongoClient[dict[str, Any]],
+        client_loop: asyncio.AbstractEventLoop | None,
+    ) -> None:
+        # Close on the client's own loop if it still runs (in another thread);
+        # once that loop is gone, the current loop can close it.
+        future: asyncio.Future[None]
+        if client_loop is not None and client_loop.is_running():
+            future = asyncio.wrap_future(
+                asyncio.run_coroutine_threadsafe(client.close(), client_loop)
+            )
+        else:
+            future = asyncio.ensure_future(client.close())
+        self._closing.add(future)
+        future.add_done_callback(self._finish_close)
+
+    def _finish_close(self, future: asyncio.Future[None]) -> None:
+        self._closing.discard(future)
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning(
+                f"Failed to close stale MongoDB client: {future.exception()}"
+            )
+
+
+# Global async database instance
+async_db_connection = AsyncDatabaseConnection()
+
+
+def get_async_db() -> AsyncDatabase[dict[str, Any]]:
+    """Get async database instance - must be called from a coroutine"""
+    return async_db_connection.get_database()
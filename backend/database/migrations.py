@@ -0,0 +1,126 @@
+"""
+Versioned schema migrations for the bot's MongoDB collections.
+
+Each migration runs once per database; applied versions are recorded in the
+schema_migrations collection. Migrations must be idempotent, since two
+processes starting at the same time may both run a pending migration.
+"""
+
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Any
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.database import Database
+from pymongo.errors import DuplicateKeyError
+
+from .connection import get_db
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[Database[dict[str, Any]]], None]
+
+
+def _dedupe_processed_mentions(db: Database[dict[str, Any]]) -> None:
+    # A unique index can't be built while duplicates exist; keep the most
+    # recent record of each mention.
+    duplicates = db.processed_mentions.aggregate(
+        [
+            {"$sort": {"processed_at": DESCENDING}},
+            {
+                "$group": {
+                    "_id": "$mention_id",
+                    "ids": {"$push": "$_id"},
+                    "count": {"$sum": 1},
+                }
+            },
+            {"$match": {"count": {"$gt": 1}}},
+        ],
+        # Grouping millions of mentions can exceed the 100 MB in-memory limit
+        allowDiskUse=True,
+    )
+    for group in duplicates:
+        db.processed_mentions.delete_many({"_id": {"$in": group["ids"][1:]}})
+
+
+def _index_processed_mentions(db: Database[dict[str, Any]]) -> None:
+    _dedupe_processed_mentions(db)
+    db.processed_mentions.create_index(
+        [("mention_id", ASCENDING)], unique=True, name="mention_id_unique"
+    )
+    db.processed_mentions.create_index(
+        [("status", ASCENDING), ("processed_at", ASCENDING)],
+        name="status_processed_at",
+    )
+    db.processed_mentions.create_index(
+        [("processed_at", DESCENDING)], name="processed_at"
+    )
+
+
+def _index_generation_jobs(db: Database[dict[str, Any]]) -> None:
+    db.generation_jobs.create_index(
+        [("mention_id", ASCENDING)], unique=True, name="mention_id_unique"
+    )
+    db.generation_jobs.create_index(
+        [("status", ASCENDING), ("created_at", ASCENDING)],
+        name="status_created_at",
+    )
+
+
+# bot_state only holds documents looked up by _id, which is always indexed.
+MIGRATIONS = [
+    Migration(1, "Index processed_mentions", _index_processed_mentions),
+    Migration(2, "Index generation_jobs", _index_generation_jobs),
+]
+
+
+def get_applied_versions(db: Database[dict[str, Any]] | None = None) -> set[int]:
+    """Get the versions of the migrations already applied to the database"""
+    db = db if db is not None else get_db()
+    return {doc["_id"] for doc in db.schema_migrations.find({}, {"_id": 1})}
+
+
+def apply_migrations(db: Database[dict[str, Any]] | None = None) -> list[int]:
+    """
+    Apply all pending migrations in version order.
+
+    Args:
+        db: Database to migrate (defaults to the bot's database)
+
+    Returns:
+        Versions of the migrations applied by this call
+    """
+    db = db if db is not None else get_db()
+    applied = get_applied_versions(db)
+
+    newly_applied = []
+    for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+        if migration.version in applied:
+            continue
+
+        logger.info(f"Applying migration {migration.version}: {migration.description}")
+        migration.apply(db)
+
+        try:
+            db.schema_migrations.insert_one(
+                {
+                    "_id": migration.version,
+                    "description": migration.description,
+                    "applied_at": datetime.now(UTC),
+                }
+            )
+        except DuplicateKeyError:
+            # Another process applied it concurrently
+            pass
+        newly_applied.append(migration.version)
+
+    if newly_applied:
+        logger.info(f"Applied migrations: {newly_applied}")
+    return newly_applied
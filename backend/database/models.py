@@ -1,16 +1,170 @@
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
 from typing import Any
 
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
 from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
 from .connection import get_db
 
+# Builders for the documents and queries shared with the async models
+
+
+def _mention_status(image_path: str | None) -> str:
+    # Set status based on image_path
+    if image_path == "processing":
+        return "processing"
+    elif image_path is None:
+        return "failed"
+    return "completed"
+
+
+def _mention_doc(
+    mention_id: str,
+    username: str,
+    tweet_text: str,
+    image_path: str | None,
+    author_id: str | None,
+) -> dict[str, Any]:
+    return {
+        "mention_id": mention_id,
+        "author_id": author_id,
+        "username": username,
+        "tweet_text": tweet_text,
+        "image_path": image_path,
+        "processed_at": datetime.now(UTC),
+        "status": _mention_status(image_path),
+    }
+
+
+def _processing_upserts(mentions: list[dict[str, Any]]) -> list[UpdateOne]:
+    now = datetime.now(UTC)
+    return [
+        UpdateOne(
+            {"mention_id": mention["mention_id"]},
+            {
+                "$setOnInsert": {
+                    "mention_id": mention["mention_id"],
+                    "author_id": mention.get("author_id"),
+                    "username": mention["username"],
+                    "tweet_text": mention["tweet_text"],
+                    "image_path": "processing",
+                    "processed_at": now,
+                    "status": "processing",
+                }
+            },
+            upsert=True,
+        )
+        for mention in mentions
+    ]
+
+
+def _upserted_indexes(error: BulkWriteError) -> list[int]:
+    # Concurrent inserts of the same mention fail on the unique index;
+    # everything else in the batch is still written.
+    return [doc["index"] for doc in error.details.get("upserted", [])]
+
+
+def _stale_processing_filter(lease_seconds: float) -> dict[str, Any]:
+    cutoff = datetime.now(UTC) - timedelta(seconds=lease_seconds)
+    return {"status": "processing", "processed_at": {"$lt": cutoff}}
+
+
+def _result_update(image_path: str | None) -> dict[str, Any]:
+    return {
+        "$set": {
+            "image_path": image_path,
+            "status": "completed" if image_path else "failed",
+        }
+    }
+
+
+def _job_upserts(jobs: list[dict[str, Any]]) -> list[UpdateOne]:
+    now = datetime.now(UTC)
+    return [
+        UpdateOne(
+            {"mention_id": job["mention_id"]},
+            {
+                "$setOnInsert": {
+                    "mention_id": job["mention_id"],
+                    "author_id": job.get("author_id"),
+                    "username": job["username"],
+                    "tweet_text": job["tweet_text"],
+                    "status": "queued",
+                    "attempts": 0,
+                    "created_at": job.get("created_at") or now,
+                    "updated_at": now,
+                }
+            },
+            upsert=True,
+        )
+        for job in jobs
+    ]
+
+
+def _requeue_update() -> dict[str, Any]:
+    return {"$set": {"status": "queued", "updated_at": datetime.now(UTC)}}
+
+
+def _exhausted_filter(max_attempts: int) -> dict[str, Any]:
+    # Jobs left running that have already been claimed max_attempts times
+    return {"status": "running", "attempts": {"$gte": max_attempts}}
+
+
+def _claim_update() -> dict[str, Any]:
+    now = datetime.now(UTC)
+    return {
+        "$set": {"status": "running", "started_at": now, "updated_at": now},
+        "$inc": {"attempts": 1},
+    }
+
+
+def _finish_update(status: str, fields: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "$set": {
+            "status": status,
+            "finished_at": datetime.now(UTC),
+            "updated_at": datetime.now(UTC),
+            **fields,
+        }
+    }
+
+
+def _checkpoint_update(mention_id: str) -> dict[str, Any]:
+    return {"$set": {"last_mention_id": mention_id, "updated_at": datetime.now(UTC)}}
+
+
+def _increment_processed_update() -> dict[str, Any]:
+    return {
+        "$inc": {"total_mentions_processed": 1},
+        "$set": {"updated_at": datetime.now(UTC)},
+        "$setOnInsert": {"uptime_start": datetime.now(UTC)},
+    }
+
+
+def _bot_stats(doc: dict[str, Any] | None) -> dict[str, Any]:
+    if not doc:
+        return {
+            "total_mentions_processed": 0,
+            "last_active": None,
+            "uptime_start": datetime.now(UTC),
+        }
+
+    return {
+        "total_mentions_processed": doc.get("total_mentions_processed", 0),
+        "last_active": doc.get("updated_at"),
+        "uptime_start": doc.get("uptime_start", datetime.now(UTC)),
+    }
+
+
+PENDING_JOB_STATUSES = ["queued", "running"]
+
 
 class ProcessedMention:
     """Model for tracking processed mentions"""
 
     def __init__(self):
-        self.collection: Collection = get_db().processed_mentions
+        self.collection: Collection[dict[str, Any]] = get_db().processed_mentions
 
     def mark_as_processed(
         self,
@@ -18,30 +172,20 @@ class ProcessedMention:
         username: str,
         tweet_text: str,
         image_path: str | None = None,
+        author_id: str | None = None,
     ) -> bool:
         """Mark a mention as processed"""
         try:
-            # Set status based on image_path
-            if image_path == "processing":
-                status = "processing"
-            elif image_path is None:
-                status = "failed"
-            else:
-                status = "completed"
-
-            doc = {
-                "mention_id": mention_id,
-                "username": username,
-                "tweet_text": tweet_text,
-                "image_path": image_path,
-                "processed_at": datetime.now(UTC),
-                "status": status,
-            }
+            doc = _mention_doc(mention_id, username, tweet_text, image_path, author_id)
+            status = doc["status"]
 
             result = self.collection.insert_one(doc)
             print(f"Marked mention {mention_id} with status '{status}' in database")
             return result.acknowledged
 
+        except DuplicateKeyError:
+            print(f"Mention {mention_id} is already recorded in database")
+            return False
         except Exception as e:
             print(f"Error marking mention as processed: {e}")
             return False
@@ -49,11 +193,85 @@ class ProcessedMention:
     def is_processed(self, mention_id: str) -> bool:
         """Check if a mention has already been processed"""
         try:
-            return self.collection.find_one({"mention_id": mention_id}) is not None
+            # Projecting only the indexed field lets the lookup be served from the index
+            doc = self.collection.find_one(
+                {"mention_id": mention_id}, {"_id": 0, "mention_id": 1}
+            )
+            return doc is not None
         except Exception as e:
             print(f"Error checking if mention is processed: {e}")
             return False
 
+    def get_processed_ids(self, mention_ids: list[str]) -> set[str]:
+        """Get the subset of mention IDs that have already been processed"""
+        if not mention_ids:
+            return set()
+        try:
+            cursor = self.collection.find(
+                {"mention_id": {"$in": list(mention_ids)}}, {"_id": 0, "mention_id": 1}
+            )
+            return {doc["mention_id"] for doc in cursor}
+        except Exception as e:
+            print(f"Error checking processed mentions: {e}")
+            return set()
+
+    def mark_many_as_processing(self, mentions: list[dict[str, Any]]) -> set[str]:
+        """
+        Record a batch of mentions as processing in one bulk write.
+
+        Args:
+            mentions: Dicts with mention_id, username, tweet_text and author_id
+
+        Returns:
+            IDs of the mentions this call recorded; mentions already in the
+            database are left untouched and omitted
+
+        Raises:
+            PyMongoError: If the batch could not be written, so callers don't
+                mistake a failed write for mentions recorded elsewhere
+        """
+        if not mentions:
+            return set()
+
+        try:
+            result = self.collection.bulk_write(
+                _processing_upserts(mentions), ordered=False
+            )
+            upserted = list(result.upserted_ids or {})
+        except BulkWriteError as e:
+            upserted = _upserted_indexes(e)
+
+        recorded = {mentions[index]["mention_id"] for index in upserted}
+        print(f"Marked {len(recorded)} mentions with status 'processing' in database")
+        return recorded
+
+    def get_stale_processing(
+        self, lease_seconds: float, limit: int = 50, skip: int = 0
+    ) -> list[dict[str, Any]]:
+        """Get a page of mentions stuck in 'processing' past the lease, oldest first"""
+        try:
+            cursor = (
+                self.collection.find(_stale_processing_filter(lease_seconds))
+                .sort([("processed_at", ASCENDING), ("_id", ASCENDING)])
+                .skip(skip)
+                .limit(limit)
+            )
+            return list(cursor)
+        except Exception as e:
+            print(f"Error getting stale processing mentions: {e}")
+            return []
+
+    def set_result(self, mention_id: str, image_path: str | None) -> bool:
+        """Record the final media path of a mention (None if generation failed)"""
+        try:
+            result = self.collection.update_one(
+                {"mention_id": mention_id}, _result_update(image_path)
+            )
+            return result.acknowledged
+        except Exception as e:
+            print(f"Error updating processed mention {mention_id}: {e}")
+            return False
+
     def get_processed_mentions(self, limit: int = 100) -> list[dict[str, Any]]:
         """Get recent processed mentions"""
         try:
@@ -68,7 +286,7 @@ class BotState:
     """Model for tracking bot state and configuration"""
 
     def __init__(self):
-        self.collection: Collection = get_db().bot_state
+        self.collection: Collection[dict[str, Any]] = get_db().bot_state
         self._state_doc_id = "twitter_bot_state"
 
     def get_last_mention_id(self) -> str | None:
@@ -83,13 +301,9 @@ class BotState:
     def set_last_mention_id(self, mention_id: str) -> bool:
         """Set the last processed mention ID"""
         try:
-            update_doc = {
-                "$set": {"last_mention_id": mention_id, "updated_at": datetime.now(UTC)}
-            }
-
             result = self.collection.update_one(
                 {"_id": self._state_doc_id},
-                update_doc,
+                _checkpoint_update(mention_id),
                 upsert=True,  # Create if doesn't exist
             )
             return result.acknowledged
@@ -101,19 +315,7 @@ class BotState:
     def get_bot_stats(self) -> dict[str, Any]:
         """Get bot statistics"""
         try:
-            doc = self.collection.find_one({"_id": self._state_doc_id})
-            if not doc:
-                return {
-                    "total_mentions_processed": 0,
-                    "last_active": None,
-                    "uptime_start": datetime.now(UTC),
-                }
-
-            return {
-                "total_mentions_processed": doc.get("total_mentions_processed", 0),
-                "last_active": doc.get("updated_at"),
-                "uptime_start": doc.get("uptime_start", datetime.now(UTC)),
-            }
+            return _bot_stats(self.collection.find_one({"_id": self._state_doc_id}))
         except Exception as e:
             print(f"Error getting bot stats: {e}")
             return {}
@@ -121,17 +323,127 @@ class BotState:
     def increment_processed_count(self) -> bool:
         """Increment the count of processed mentions"""
         try:
-            update_doc = {
-                "$inc": {"total_mentions_processed": 1},
-                "$set": {"updated_at": datetime.now(UTC)},
-                "$setOnInsert": {"uptime_start": datetime.now(UTC)},
-            }
-
             result = self.collection.update_one(
-                {"_id": self._state_doc_id}, update_doc, upsert=True
+                {"_id": self._state_doc_id}, _increment_processed_update(), upsert=True
             )
             return result.acknowledged
 
         except Exception as e:
             print(f"Error incrementing processed count: {e}")
             return False
+
+
+class GenerationJob:
+    """Model for the persistent queue of media generation jobs"""
+
+    def __init__(self, collection_name: str = "generation_jobs"):
+        self.collection: Collection[dict[str, Any]] = get_db()[collection_name]
+
+    def enqueue(
+        self,
+        mention_id: str,
+        author_id: str | None,
+        username: str,
+        tweet_text: str,
+        created_at: datetime | None = None,
+    ) -> bool:
+        """Queue a generation job for a mention (no-op if already queued)"""
+        return self.enqueue_many(
+            [
+                {
+                    "mention_id": mention_id,
+                    "author_id": author_id,
+                    "username": username,
+                    "tweet_text": tweet_text,
+                    "created_at": created_at,
+                }
+            ]
+        )
+
+    def enqueue_many(self, jobs: list[dict[str, Any]]) -> bool:
+        """Queue generation jobs for a batch of mentions in one bulk write"""
+        if not jobs:
+            return True
+
+        try:
+            result = self.collection.bulk_write(_job_upserts(jobs), ordered=False)
+            return result.acknowledged
+        except BulkWriteError:
+            # Jobs that lost an insert race were queued by someone else
+            return True
+        except Exception as e:
+            print(f"Error enqueuing generation jobs: {e}")
+            return False
+
+    def claim_next(self) -> dict[str, Any] | None:
+        """Atomically move the oldest queued job to running and return it"""
+        try:
+            return self.collection.find_one_and_update(
+                {"status": "queued"},
+                _claim_update(),
+                sort=[("created_at", ASCENDING)],
+                return_document=ReturnDocument.AFTER,
+            )
+        except Exception as e:
+            print(f"Error claiming generation job: {e}")
+            return None
+
+    def mark_done(self, mention_id: str, media_path: str) -> bool:
+        """Mark a job as done with the path of the generated media"""
+        return self._finish(mention_id, "done", {"media_path": media_path})
+
+    def mark_failed(self, mention_id: str, error: str | None = None) -> bool:
+        """Mark a job as failed"""
+        return self._finish(mention_id, "failed", {"error": error})
+
+    def count_pending(self) -> int:
+        """Count jobs that are queued or running"""
+        try:
+            return self.collection.count_documents(
+                {"status": {"$in": PENDING_JOB_STATUSES}}
+            )
+        except Exception as e:
+            print(f"Error counting pending generation jobs: {e}")
+            return 0
+
+    def fail_exhausted(self, max_attempts: int) -> list[str]:
+        """Fail jobs left running after max_attempts claims; returns their mention IDs"""
+        try:
+            mention_ids = [
+                doc["mention_id"]
+                for doc in self.collection.find(
+                    _exhausted_filter(max_attempts), {"_id": 0, "mention_id": 1}
+                )
+            ]
+            if mention_ids:
+                self.collection.update_many(
+                    {"mention_id": {"$in": mention_ids}, "status": "running"},
+                    _finish_update(
+                        "failed", {"error": f"Gave up after {max_attempts} attempts"}
+                    ),
+                )
+            return mention_ids
+        except Exception as e:
+            print(f"Error failing exhausted generation jobs: {e}")
+            return []
+
+    def requeue_running(self) -> int:
+        """Move jobs left running by a previous process back to the queue"""
+        try:
+            result = self.collection.update_many(
+                {"status": "running"}, _requeue_update()
+            )
+            return result.modified_count
+        except Exception as e:
+            print(f"Error requeuing running generation jobs: {e}")
+            return 0
+
+    def _finish(self, mention_id: str, status: str, fields: dict[str, Any]) -> bool:
+        try:
+            result = self.collection.update_one(
+                {"mention_id": mention_id}, _finish_update(status, fields)
+            )
+            return result.acknowledged
+        except Exception as e:
+            print(f"Error marking generation job as {status}: {e}")
+            return False
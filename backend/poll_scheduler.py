@@ -0,0 +1,109 @@
+import os
+from typing import Any
+
+from .twitter_client import RateLimit
+
+
+class AdaptivePollScheduler:
+    """
+    Chooses the delay before the next mention poll.
+
+    The interval shrinks while mentions keep arriving and grows while polls come
+    back empty, within [min_interval, max_interval]. It never drops below the
+    spacing that spreads the remaining rate limit budget evenly over the rest of
+    the window, and waits out the window once the budget is spent.
+    """
+
+    def __init__(
+        self,
+        initial_interval: float = 90,
+        min_interval: float = 15,
+        max_interval: float = 300,
+        speedup: float = 0.5,
+        backoff: float = 1.5,
+        reserve_calls: int = 1,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.speedup = speedup
+        self.backoff = backoff
+        self.reserve_calls = reserve_calls
+
+        self.interval = min(max(initial_interval, min_interval), max_interval)
+        self.last_found = 0
+        self.calls_per_poll = 1
+        self.rate_limit: RateLimit | None = None
+
+    def record_poll(self, found: int, rate_limit: RateLimit | None = None) -> float:
+        """
+        Update the schedule with the result of a poll.
+
+        Args:
+            found: Number of new mentions the poll returned
+            rate_limit: Rate limit state of the mentions endpoint after the poll
+
+        Returns:
+            Seconds to wait before the next poll
+        """
+        self.last_found = found
+        if found:
+            target = self.interval * self.speedup
+        else:
+            target = self.interval * self.backoff
+        self.interval = min(max(target, self.min_interval), self.max_interval)
+
+        if rate_limit is not None:
+            previous = self.rate_limit
+            # A poll can take several calls when it pages through a backlog;
+            # measure it from the budget used within the same window.
+            if previous is not None and previous.reset_at == rate_limit.reset_at:
+                self.calls_per_poll = max(1, previous.remaining - rate_limit.remaining)
+            self.rate_limit = rate_limit
+
+        return self.next_delay()
+
+    def budget_interval(self) -> float:
+        """Smallest interval that keeps polling within the remaining rate limit budget."""
+        if self.rate_limit is None:
+            return 0.0
+
+        until_reset = self.rate_limit.seconds_until_reset()
+        polls_left = (
+            self.rate_limit.remaining - self.reserve_calls
+        ) // self.calls_per_poll
+        if polls_left <= 0:
+            # Budget spent: wait for the window to reset
+            return until_reset + 1
+        return until_reset / polls_left
+
+    def next_delay(self) -> float:
+        """Seconds to wait before the next poll."""
+        return max(self.interval, self.budget_interval())
+
+    def metrics(self) -> dict[str, Any]:
+        """Get the current schedule and rate limit budget."""
+        return {
+            "poll_interval": self.interval,
+            "next_delay": self.next_delay(),
+            "last_found": self.last_found,
+            "calls_per_poll": self.calls_per_poll,
+            "rate_limit_limit": self.rate_limit.limit if self.rate_limit else None,
+            "rate_limit_remaining": (
+                self.rate_limit.remaining if self.rate_limit else None
+            ),
+            "rate_limit_reset_in": (
+                self.rate_limit.seconds_until_reset() if self.rate_limit else None
+            ),
+        }
+
+    @classmethod
+    def from_env(cls) -> "AdaptivePollScheduler":
+        """
+        Create a scheduler configured from POLL_INTERVAL (default 90),
+        POLL_MIN_INTERVAL (default 15) and POLL_MAX_INTERVAL (default 300) seconds.
+        """
+        return cls(
+            initial_interval=float(os.getenv("POLL_INTERVAL", "90")),
+            min_interval=float(os.getenv("POLL_MIN_INTERVAL", "15")),
+            max_interval=float(os.getenv("POLL_MAX_INTERVAL", "300")),
+        )
@@ -1,13 +1,98 @@
+import asyncio
+import io
 import logging
 import os
+import time
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 
+import aiohttp
 import tweepy
 from dotenv import load_dotenv
+from tweepy.asynchronous import AsyncClient
 
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+MENTION_TWEET_FIELDS = [
+    "author_id",
+    "created_at",
+    "text",
+    "in_reply_to_user_id",
+    "referenced_tweets",
+]
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Rate limit state of an endpoint, from the x-rate-limit-* response headers."""
+
+    limit: int
+    remaining: int
+    reset_at: float  # Unix timestamp at which the window resets
+
+    @classmethod
+    def from_headers(cls, headers) -> "RateLimit | None":
+        try:
+            return cls(
+                limit=int(headers["x-rate-limit-limit"]),
+                remaining=int(headers["x-rate-limit-remaining"]),
+                reset_at=float(headers["x-rate-limit-reset"]),
+            )
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def seconds_until_reset(self) -> float:
+        return max(0.0, self.reset_at - time.time())
+
+
+class RateLimitTrackingAsyncClient(AsyncClient):
+    """AsyncClient that remembers the latest rate limit state of each route."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rate_limits: dict[str, RateLimit] = {}
+
+    async def request(self, method, route, params=None, json=None, user_auth=False):
+        try:
+            response = await super().request(method, route, params, json, user_auth)
+        except tweepy.HTTPException as e:
+            self._record_rate_limit(method, route, e.response.headers)
+            raise
+        self._record_rate_limit(method, route, response.headers)
+        return response
+
+    def _record_rate_limit(self, method, route, headers) -> None:
+        rate_limit = RateLimit.from_headers(headers)
+        if rate_limit is not None:
+            self.rate_limits[f"{method} {route}"] = rate_limit
+
+
+class UserCache:
+    """LRU cache of user ID -> username, shared by the whole mention pipeline."""
+
+    def __init__(self, maxsize: int = 10_000):
+        self.maxsize = maxsize
+        self._usernames: OrderedDict[str, str] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._usernames)
+
+    def get(self, user_id) -> str | None:
+        username = self._usernames.get(str(user_id))
+        if username is not None:
+            self._usernames.move_to_end(str(user_id))
+        return username
+
+    def put(self, user_id, username: str) -> None:
+        self._usernames[str(user_id)] = username
+        self._usernames.move_to_end(str(user_id))
+        while len(self._usernames) > self.maxsize:
+            self._usernames.popitem(last=False)
+
 
 class TwitterClient:
     """Shared Twitter API client with authentication and common utilities."""
@@ -15,6 +100,15 @@ class TwitterClient:
     def __init__(self):
         self.api = self._setup_twitter_api()
         self.client = self._setup_twitter_client_v2()
+        self.async_client = self._setup_async_twitter_client_v2()
+        self.user_cache = UserCache(int(os.getenv("USER_CACHE_SIZE", "10000")))
+
+        # tweepy has no async v1.1 client, so media uploads run on a small
+        # dedicated thread pool instead of blocking the event loop.
+        self._upload_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("TWITTER_UPLOAD_THREADS", "4")),
+            thread_name_prefix="media-upload",
+        )
 
     def _setup_twitter_api(self) -> tweepy.API:
         """Setup Twitter API v1.1 client for media uploads."""
@@ -80,60 +174,203 @@ class TwitterClient:
 
         return client
 
+    def _setup_async_twitter_client_v2(self) -> RateLimitTrackingAsyncClient:
+        """Setup async Twitter API v2 client with the same credentials."""
+        # Select credentials based on environment
+        environment = os.getenv("ENVIRONMENT", "dev").lower()
+        if environment == "production":
+            access_token = os.getenv("TWITTER_ACCESS_TOKEN")
+            access_token_secret = os.getenv("TWITTER_ACCESS_SECRET")
+        else:
+            access_token = os.getenv("DEV_TWITTER_ACCESS_TOKEN")
+            access_token_secret = os.getenv("DEV_TWITTER_ACCESS_SECRET")
+
+        return RateLimitTrackingAsyncClient(
+            bearer_token=os.getenv("TWITTER_BEARER_TOKEN"),
+            consumer_key=os.getenv("TWITTER_API_KEY"),
+            consumer_secret=os.getenv("TWITTER_API_SECRET"),
+            access_token=access_token,
+            access_token_secret=access_token_secret,
+            wait_on_rate_limit=True,
+        )
+
+    def _ensure_async_session(self) -> None:
+        # Without a session, tweepy opens (and closes) a new connection pool for
+        # every request; share one so connections are kept alive between calls.
+        session = self.async_client.session
+        if session is None or session.closed:
+            self.async_client.session = aiohttp.ClientSession()
+
     def get_me(self):
         if not hasattr(self, "_me"):
             self._me = self.client.get_me()
         return self._me
 
+    async def get_me_async(self):
+        if not hasattr(self, "_me"):
+            self._ensure_async_session()
+            self._me = await self.async_client.get_me()
+            self.user_cache.put(self._me.data.id, self._me.data.username)
+        return self._me
+
+    def _cache_included_users(self, response) -> None:
+        """Remember the usernames of users expanded into an API response."""
+        for user in (response.includes or {}).get("users", []):
+            self.user_cache.put(user.id, user.username)
+
+    @staticmethod
+    def _filter_main_tweet_mentions(mentions: list, me_id) -> list:  # type: ignore[type-arg]
+        # Filter out replies - only keep main tweets (where in_reply_to_user_id is None)
+        # An edge case is that when the tweet starts with a tag, the tweet will be considered
+        # a reply even if it's a standalone tweet, e.g. "@memery_labs, create an image of ..."
+        # in this case, mention.in_reply_to_user_id will be the same as me_id
+        return [
+            mention
+            for mention in mentions
+            # defensive measure to filter out self-tagging
+            if mention.author_id != me_id
+            and (
+                # only allow standalone tweet
+                not hasattr(mention, "in_reply_to_user_id")
+                or mention.in_reply_to_user_id is None
+                # including standalone tweet starting with the tag
+                or (
+                    mention.referenced_tweets is None
+                    and mention.in_reply_to_user_id == me_id
+                )
+            )
+        ]
+
+    @staticmethod
+    def _mention_page_params(me_id, since_id: str | None, page_size: int) -> dict:  # type: ignore[type-arg]
+        return {
+            "id": me_id,
+            "since_id": since_id,
+            "max_results": max(5, min(page_size, 100)),  # v2 API requires 5-100
+            "tweet_fields": MENTION_TWEET_FIELDS,
+            # Include the authors in the response so that their usernames
+            # don't need a separate lookup per mention.
+            "expansions": ["author_id"],
+            "user_fields": ["username"],
+        }
+
     def get_mentions(
         self, since_id: str | None = None, limit: int = 100
     ) -> list:  # type: ignore[type-arg]
-        """Get recent mentions using Twitter API v2."""
+        """
+        Get mentions newer than since_id using Twitter API v2, newest first.
+
+        Follows next_token pagination until all mentions since since_id are
+        fetched or limit mentions have been read.
+        """
         try:
-            # Use v2 API to get mentions
             me_id = self.get_me().data.id
-            mentions = self.client.get_users_mentions(
-                id=me_id,
-                since_id=since_id,
-                max_results=max(5, min(limit, 100)),  # v2 API requires 5-100
-                tweet_fields=[
-                    "author_id",
-                    "created_at",
-                    "text",
-                    "in_reply_to_user_id",
-                    "referenced_tweets",
-                ],
-            )
+            mentions: list = []  # type: ignore[type-arg]
+            pagination_token = None
+            while len(mentions) < limit:
+                response = self.client.get_users_mentions(
+                    **self._mention_page_params(me_id, since_id, limit - len(mentions)),
+                    pagination_token=pagination_token,
+                )
+                self._cache_included_users(response)
+                mentions.extend(response.data or [])
+
+                pagination_token = (response.meta or {}).get("next_token")
+                if not pagination_token:
+                    break
 
-            if mentions.data:
-                # Filter out replies - only keep main tweets (where in_reply_to_user_id is None)
-                # An edge case is that when the tweet starts with a tag, the tweet will be considered
-                # a reply even if it's a standalone tweet, e.g. "@memery_labs, create an image of ..."
-                # in this case, mention.in_reply_to_user_id will be the same as me_id
-                main_tweet_mentions = [
-                    mention
-                    for mention in mentions.data
-                    # defensive measure to filter out self-tagging
-                    if mention.author_id != me_id
-                    and (
-                        # only allow standalone tweet
-                        not hasattr(mention, "in_reply_to_user_id")
-                        or mention.in_reply_to_user_id is None
-                        # including standalone tweet starting with the tag
-                        or (
-                            mention.referenced_tweets is None
-                            and mention.in_reply_to_user_id == me_id
-                        )
-                    )
-                ]
-                return main_tweet_mentions[:limit]
-            else:
-                return []
+            return self._filter_main_tweet_mentions(mentions[:limit], me_id)
 
         except Exception as e:
             logger.error(f"Error fetching mentions: {e}")
             return []
 
+    async def iter_mentions_async(
+        self, since_id: str | None = None, limit: int = 500
+    ) -> AsyncIterator:  # type: ignore[type-arg]
+        """
+        Stream the mentions newer than since_id, oldest first.
+
+        The API returns pages newest first, so all pages back to since_id are
+        fetched (following next_token) before the first mention is yielded.
+
+        Args:
+            since_id: Only return mentions newer than this tweet ID
+            limit: Maximum number of mentions to yield; if the backlog is larger,
+                the oldest limit mentions are yielded and the newer ones are
+                left for the next call (which resumes after the last one the
+                caller checkpoints)
+
+        Yields:
+            Main-tweet mentions (replies filtered out), oldest first
+        """
+        try:
+            me_id = (await self.get_me_async()).data.id
+            self._ensure_async_session()
+
+            # Pages arrive newest first, so a bounded deque ends up holding the
+            # oldest limit mentions seen; only those are kept in memory.
+            oldest: deque = deque(maxlen=limit)  # type: ignore[type-arg]
+            fetched = 0
+            pagination_token = None
+            while True:
+                response = await self.async_client.get_users_mentions(
+                    **self._mention_page_params(me_id, since_id, limit),
+                    pagination_token=pagination_token,
+                )
+                self._cache_included_users(response)
+                page = self._filter_main_tweet_mentions(response.data or [], me_id)
+                oldest.extend(page)
+                fetched += len(page)
+
+                pagination_token = (response.meta or {}).get("next_token")
+                if not pagination_token:
+                    break
+
+            if fetched > limit:
+                logger.warning(
+                    f"Mention backlog of {fetched} exceeds {limit}; processing the "
+                    "oldest first, newer mentions are picked up on the next poll"
+                )
+
+        except Exception as e:
+            # Yield nothing rather than only the newest pages, which would move
+            # the caller's checkpoint past the mentions that failed to load.
+            logger.error(f"Error fetching mentions: {e}")
+            return
+
+        for mention in reversed(oldest):
+            yield mention
+
+    async def get_newest_mention_id_async(self) -> str | None:
+        """Get the ID of the newest mention (reply or not), or None if there are none."""
+        me_id = (await self.get_me_async()).data.id
+        self._ensure_async_session()
+        response = await self.async_client.get_users_mentions(
+            **self._mention_page_params(me_id, None, 5)
+        )
+        newest_id = (response.meta or {}).get("newest_id")
+        if newest_id is None and response.data:
+            newest_id = response.data[0].id
+        return str(newest_id) if newest_id is not None else None
+
+    def get_mentions_rate_limit(self) -> RateLimit | None:
+        """Get the rate limit state of the mentions endpoint as of the last poll."""
+        if not hasattr(self, "_me"):
+            return None
+        route = f"GET /2/users/{self._me.data.id}/mentions"
+        return self.async_client.rate_limits.get(route)
+
+    async def get_username_async(self, user_id) -> str:
+        """Get the username of a user by ID, looking it up only on a cache miss."""
+        username = self.user_cache.get(user_id)
+        if username is None:
+            self._ensure_async_session()
+            user = await self.async_client.get_user(id=user_id)
+            username = user.data.username
+            self.user_cache.put(user_id, username)
+        return username
+
     def reply_with_media(
         self,
         mention_id: int,
@@ -162,10 +399,56 @@ class TwitterClient:
             logger.error(f"Error posting reply with media: {e}")
             raise
 
-    def upload_media(self, media_path: str):
-        """Upload media to Twitter and return media object."""
+    async def reply_with_media_async(
+        self,
+        mention_id: int,
+        username: str,
+        media_path: str,
+        custom_text: str | None = None,
+        media_data: bytes | None = None,
+    ) -> None:
+        """
+        Reply to a mention with an media without blocking the event loop.
+
+        If media_data is given, it is uploaded from memory and media_path only
+        names the file (its extension determines the media type).
+        """
+        try:
+            # Upload the media using v1.1 API (only way to upload media)
+            media = await self.upload_media_async(media_path, media_data)
+
+            # Create reply text (empty if no custom text specified)
+            reply_text = custom_text if custom_text else ""
+
+            # Post the reply using v2 API
+            self._ensure_async_session()
+            await self.async_client.create_tweet(
+                text=reply_text,
+                in_reply_to_tweet_id=mention_id,
+                media_ids=[media.media_id],
+            )
+
+            logger.info(f"Posted reply with media to @{username}")
+
+        except Exception as e:
+            logger.error(f"Error posting reply with media: {e}")
+            raise
+
+    def upload_media(self, media_path: str, media_data: bytes | None = None):
+        """Upload media to Twitter (from memory if media_data is given) and return media object."""
         try:
+            if media_data is not None:
+                return self.api.media_upload(media_path, file=io.BytesIO(media_data))
             return self.api.media_upload(media_path)
         except Exception as e:
             logger.error(f"Error uploading media: {e}")
             raise
+
+    async def upload_media_async(
+        self, media_path: str, media_data: bytes | None = None
+    ):
+        """Upload media to Twitter on the upload thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._upload_executor, self.upload_media, media_path, media_data
+        )
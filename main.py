@@ -1,13 +1,26 @@
 import asyncio
 import logging
 import os
+from typing import Any
 
 from agents import Runner, trace
+from aiohttp import web
 
-from agent import create_image_generation_agent
-from backend.database.models import BotState, ProcessedMention
+from agent import CLASSIC_MEMES, create_image_generation_agent
+from backend.database.async_models import (
+    AsyncBotState,
+    AsyncGenerationJob,
+    AsyncProcessedMention,
+)
+from backend.database.migrations import apply_migrations
+from backend.poll_scheduler import AdaptivePollScheduler
 from backend.twitter_client import TwitterClient
-from utils import build_prompt_from_tweet
+from backend.webhook import WebhookMention, create_webhook_app
+from tools.clients import close_clients
+from tools.media_store import get_media_store
+from tools.meme_assets import get_meme_asset_index
+from tools.x_profile import start_profile_prefetch
+from utils import build_prompt_from_tweet, extract_handles_from_tweet
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -18,18 +31,40 @@ logger = logging.getLogger(__name__)
 class TwitterBot(TwitterClient):
     def __init__(self):
         super().__init__()
-        self.poll_interval = 90  # 90 seconds
-
-        # Initialize database models
-        self.processed_mentions = ProcessedMention()
-        self.bot_state = BotState()
-
-        # Load last mention ID from database
-        self.last_mention_id = self.bot_state.get_last_mention_id()
-        if self.last_mention_id:
-            logger.info(f"Loaded last mention ID from database: {self.last_mention_id}")
-        else:
-            logger.info("No previous mention ID found in database")
+        # Poll faster while mentions are arriving, slower while idle, and never
+        # faster than the mentions endpoint's rate limit budget allows.
+        self.poll_scheduler = AdaptivePollScheduler.from_env()
+
+        # Generation worker pool size, and how many queued or running jobs the
+        # poller allows before it stops fetching new mentions (backpressure).
+        self.num_workers = int(os.getenv("GENERATION_WORKERS", "2"))
+        self.max_pending_jobs = int(os.getenv("MAX_PENDING_JOBS", "20"))
+
+        # A job still running at startup after this many claims has likely
+        # crashed the process every time, so it is failed instead of retried.
+        self.max_job_attempts = int(os.getenv("GENERATION_MAX_ATTEMPTS", "3"))
+
+        # Mentions left "processing" for longer than this (in seconds) are assumed
+        # to belong to a dead process and are re-queued on startup.
+        self.processing_lease = float(os.getenv("PROCESSING_LEASE_SECONDS", "600"))
+
+        # Upper bound on the mentions drained per poll (the oldest are taken
+        # first, the rest on later polls), and how many are deduped and recorded
+        # per database batch.
+        self.max_mentions_per_poll = int(os.getenv("MAX_MENTIONS_PER_POLL", "500"))
+        self.mention_batch_size = int(os.getenv("MENTION_BATCH_SIZE", "100"))
+
+        # Bring indexes up to date before touching the collections
+        apply_migrations()
+
+        # Initialize database models (async, so queries don't block the event loop)
+        self.processed_mentions = AsyncProcessedMention()
+        self.bot_state = AsyncBotState()
+        self.generation_jobs = AsyncGenerationJob()
+        self._job_available = asyncio.Event()
+        self._workers: list[asyncio.Task[None]] = []
+        self.last_mention_id: str | None = None
+        self._checkpoint_seeded = False
 
         # Initialize image generation agent
         self._setup_image_agent()
@@ -45,16 +80,27 @@ class TwitterBot(TwitterClient):
             self.image_agent = None
 
     async def start_polling(self):
-        """Start the main polling loop that checks for mentions every 90 seconds."""
+        """Start the main polling loop, checking for mentions on an adaptive schedule."""
         logger.info(
-            f"Starting Twitter bot with {self.poll_interval}-second polling interval..."
+            f"Starting Twitter bot with {self.poll_scheduler.interval}-second "
+            "initial polling interval..."
         )
 
+        await self.load_last_mention_id()
+        await self.load_meme_assets()
+        await self.recover_stale_mentions()
+        await self.start_workers()
+
         while True:
             try:
-                await self.check_and_process_mentions()
-                logger.info(f"Waiting {self.poll_interval} seconds until next check...")
-                await asyncio.sleep(self.poll_interval)
+                await self._wait_for_queue_capacity()
+                found = await self.check_and_process_mentions()
+                delay = self.poll_scheduler.record_poll(
+                    found, self.get_mentions_rate_limit()
+                )
+                logger.info(f"Poll metrics: {self.poll_scheduler.metrics()}")
+                logger.info(f"Waiting {delay:.0f} seconds until next check...")
+                await asyncio.sleep(delay)
 
             except KeyboardInterrupt:
                 logger.info("Bot stopped by user")
@@ -63,124 +109,360 @@ class TwitterBot(TwitterClient):
                 logger.error(f"Error in polling loop: {e}")
                 await asyncio.sleep(30)  # Wait 30 seconds before retrying on error
 
-    async def check_and_process_mentions(self):
-        """Check for new mentions and process them."""
+    async def load_last_mention_id(self):
+        """Load the last mention ID from the database."""
+        self.last_mention_id = await self.bot_state.get_last_mention_id()
+        if self.last_mention_id:
+            logger.info(f"Loaded last mention ID from database: {self.last_mention_id}")
+        else:
+            logger.info("No previous mention ID found in database")
+
+    async def load_meme_assets(self):
+        """Index the local meme assets, so classic memes resolve without network calls."""
+        meme_assets = get_meme_asset_index()
+        await meme_assets.warm()
+        logger.info(f"Loaded local meme assets: {meme_assets.names()}")
+
+    async def start_webhook(self, host: str = "0.0.0.0", port: int = 8080):
+        """Serve the Account Activity webhook, processing mentions as they are pushed."""
+        consumer_secret = os.getenv("TWITTER_API_SECRET")
+        if not consumer_secret:
+            raise ValueError("TWITTER_API_SECRET is required to verify webhook events")
+
+        await self.load_last_mention_id()
+        await self.load_meme_assets()
+        await self.recover_stale_mentions()
+        await self.start_workers()
+
+        app = create_webhook_app(consumer_secret, self._ingest_webhook_mentions)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info(f"Listening for webhook events on {host}:{port}")
+
         try:
-            # Use inherited method from TwitterClients
-            mentions_list = self.get_mentions(since_id=self.last_mention_id, limit=5)
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    async def _ingest_webhook_mentions(self, mentions: list[WebhookMention]):
+        """Feed mentions pushed by the webhook into the processing pipeline."""
+        # Events carry the author's username, so no lookup is needed
+        for mention in mentions:
+            if mention.author_username:
+                self.user_cache.put(mention.author_id, mention.author_username)
+
+        me_id = (await self.get_me_async()).data.id
+        mentions = self._filter_main_tweet_mentions(mentions, me_id)
+        if mentions:
+            await self._ingest_mentions(mentions)
+
+    async def start_workers(self):
+        """Start the generation worker pool, resuming jobs left by a previous run."""
+        failed = await self.generation_jobs.fail_exhausted(self.max_job_attempts)
+        for mention_id in failed:
+            await self.processed_mentions.set_result(mention_id, None)
+        if failed:
+            logger.warning(
+                f"Failed {len(failed)} generation jobs interrupted "
+                f"{self.max_job_attempts} times: {failed}"
+            )
 
-            if not mentions_list:
-                logger.info("No new mentions found")
-                return
+        requeued = await self.generation_jobs.requeue_running()
+        if requeued:
+            logger.info(f"Requeued {requeued} generation jobs interrupted by restart")
+
+        self._workers = [
+            asyncio.create_task(self._job_worker(i)) for i in range(self.num_workers)
+        ]
+        self._job_available.set()
+        logger.info(f"Started {self.num_workers} generation workers")
+
+    async def recover_stale_mentions(self, limit: int = 50):
+        """Re-queue mentions whose processing was interrupted before they got a reply."""
+        # Recovery leaves the mentions' status alone, so page through them by
+        # offset until every stale mention has been queued.
+        recovered = 0
+        while True:
+            stale_mentions = await self.processed_mentions.get_stale_processing(
+                self.processing_lease, limit=limit, skip=recovered
+            )
+            if not stale_mentions:
+                break
+
+            # Jobs keep their original time so they run ahead of new mentions;
+            # the worker pool bounds how many of them run at once.
+            await self.generation_jobs.enqueue_many(
+                [
+                    {
+                        "mention_id": doc["mention_id"],
+                        "author_id": doc.get("author_id"),
+                        "username": doc["username"],
+                        "tweet_text": doc["tweet_text"],
+                        "created_at": doc["processed_at"],
+                    }
+                    for doc in stale_mentions
+                ]
+            )
+            recovered += len(stale_mentions)
+            if len(stale_mentions) < limit:
+                break
 
-            logger.info(f"Found {len(mentions_list)} new mentions")
+        if recovered:
+            self._job_available.set()
+            logger.info(f"Re-queued {recovered} mentions stuck in processing")
+
+    async def _wait_for_queue_capacity(self):
+        """Hold off polling while the generation queue is full."""
+        while (
+            pending := await self.generation_jobs.count_pending()
+        ) >= self.max_pending_jobs:
+            logger.info(
+                f"{pending} generation jobs pending, waiting before the next check..."
+            )
+            await asyncio.sleep(10)
 
-            # Process mentions (newest first due to cursor order)
-            for mention in reversed(mentions_list):
-                # Skip if already processed
-                if self.processed_mentions.is_processed(mention.id):
-                    logger.info(f"Skipping already processed mention {mention.id}")
+    async def _job_worker(self, worker_id: int):
+        """Claim queued generation jobs one at a time and run them."""
+        while True:
+            try:
+                # Clear before claiming, so an enqueue that signals while the
+                # claim is in flight wakes this worker instead of being lost.
+                self._job_available.clear()
+                job = await self.generation_jobs.claim_next()
+                if job is None:
+                    # Wait for a new job, re-checking the database periodically.
+                    try:
+                        await asyncio.wait_for(self._job_available.wait(), 30)
+                    except TimeoutError:
+                        pass
                     continue
 
-                await self.process_mention(mention)
+                logger.info(
+                    f"Worker {worker_id} running job for mention {job['mention_id']}"
+                )
+                await self._generate_and_reply_async(job)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in generation worker {worker_id}: {e}")
+                await asyncio.sleep(5)
+
+    async def check_and_process_mentions(self) -> int:
+        """
+        Drain all mentions since the last check, oldest first, in batches.
 
-                # Update last mention ID immediately after processing each mention
-                if mention.id:
-                    self.last_mention_id = mention.id
-                    self.bot_state.set_last_mention_id(mention.id)
-                    logger.info(f"Updated last mention ID to database: {mention.id}")
+        Returns:
+            Number of new mentions found
+        """
+        try:
+            if (
+                self.last_mention_id is None
+                and not self._checkpoint_seeded
+                and await self.seed_last_mention_id()
+            ):
+                return 0
+
+            found = 0
+            batch = []
+            # Use inherited method from TwitterClients
+            async for mention in self.iter_mentions_async(
+                since_id=self.last_mention_id, limit=self.max_mentions_per_poll
+            ):
+                found += 1
+                batch.append(mention)
+                if len(batch) >= self.mention_batch_size:
+                    await self._ingest_mentions(batch)
+                    batch = []
+            if batch:
+                await self._ingest_mentions(batch)
+
+            if found:
+                logger.info(f"Found {found} new mentions")
+            else:
+                logger.info("No new mentions found")
+            return found
 
         except Exception as e:
+            # The checkpoint only moved past batches that were fully queued
             logger.error(f"Error checking mentions: {e}")
+            return 0
+
+    async def seed_last_mention_id(self) -> bool:
+        """
+        Start a fresh checkpoint at the newest mention, without replying to it.
+
+        Without a checkpoint (fresh database or new environment), the first poll
+        would otherwise reply to the account's whole mention history.
+
+        Returns:
+            Whether the checkpoint was seeded
+        """
+        newest_id = await self.get_newest_mention_id_async()
+        # Only seed once; if there are no mentions yet, every future one is new
+        self._checkpoint_seeded = True
+        if newest_id is None:
+            return False
+
+        self.last_mention_id = newest_id
+        await self.bot_state.set_last_mention_id(newest_id)
+        logger.info(
+            f"No previous mention ID; starting after the newest mention {newest_id}"
+        )
+        return True
+
+    async def _ingest_mentions(self, mentions):
+        """
+        Dedup, record and queue a batch of mentions, then advance the checkpoint.
+
+        Raises:
+            Exception: If the batch could not be recorded and queued; the
+                checkpoint is then left before it, so the batch is fetched again
+        """
+        # Dedup the whole batch in one query
+        processed_ids = await self.processed_mentions.get_processed_ids(
+            [mention.id for mention in mentions]
+        )
+        for mention_id in processed_ids:
+            logger.info(f"Skipping already processed mention {mention_id}")
+
+        await self.process_mentions(
+            [mention for mention in mentions if mention.id not in processed_ids]
+        )
+
+        # Every mention is now recorded and queued (or owned by another
+        # process), so advance the checkpoint once per batch, to its newest
+        # mention; webhook deliveries can arrive out of order, so never move it
+        # backwards.
+        newest_id = mentions[-1].id
+        if newest_id and (
+            self.last_mention_id is None or int(newest_id) > int(self.last_mention_id)
+        ):
+            self.last_mention_id = newest_id
+            await self.bot_state.set_last_mention_id(newest_id)
+            logger.info(f"Updated last mention ID to database: {newest_id}")
 
     async def process_mention(self, mention):
-        """Process a single mention by creating async task for image generation."""
-        try:
-            # Get user info from author_id
-            user = self.client.get_user(id=mention.author_id)
-            username = user.data.username
-            tweet_text = mention.text
-
-            logger.info(f"Processing mention from @{username}: {tweet_text}")
-
-            # Mark as processing immediately to avoid duplicate processing
-            self.processed_mentions.mark_as_processed(
-                mention_id=mention.id,
-                username=username,
-                tweet_text=tweet_text,
-                image_path="processing",  # Placeholder status
+        """Process a single mention by queueing a generation job for it."""
+        await self.process_mentions([mention])
+
+    async def process_mentions(self, mentions):
+        """
+        Record a batch of mentions as processing and queue generation jobs for them.
+
+        Raises:
+            Exception: If the mentions could not be recorded or queued
+        """
+        if not mentions:
+            return
+
+        records = []
+        for mention in mentions:
+            # Authors are usually cached from the mentions response; a failed
+            # lookup is retried by the worker rather than dropping the mention.
+            try:
+                username = await self.get_username_async(mention.author_id)
+            except Exception as e:
+                logger.warning(
+                    f"Failed to look up author {mention.author_id} of mention "
+                    f"{mention.id}: {e}"
+                )
+                username = None
+            logger.info(f"Processing mention from @{username}: {mention.text}")
+            records.append(
+                {
+                    "mention_id": mention.id,
+                    "author_id": mention.author_id,
+                    "username": username,
+                    "tweet_text": mention.text,
+                }
             )
-            logger.info(f"Marked mention {mention.id} as processing in database")
 
-            # Create async task for image generation
-            asyncio.create_task(self._generate_and_reply_async(mention))
+        # Mark as processing immediately to avoid duplicate processing; mentions
+        # another process already recorded are left to it.
+        recorded = await self.processed_mentions.mark_many_as_processing(records)
+        for record in records:
+            if record["mention_id"] not in recorded:
+                logger.info(f"Mention {record['mention_id']} not recorded, skipping")
+
+        # Queue the generation jobs for the worker pool
+        if not await self.generation_jobs.enqueue_many(
+            [record for record in records if record["mention_id"] in recorded]
+        ):
+            raise RuntimeError(
+                f"Failed to queue generation jobs for {len(recorded)} mentions"
+            )
+        if recorded:
+            self._job_available.set()
 
-        except Exception as e:
-            logger.error(f"Error processing mention {mention.id}: {e}")
+    async def _generate_and_reply_async(self, job: dict[str, Any]):
+        """Run a generation job: generate media and reply to the mention."""
+        mention_id = job["mention_id"]
+        username = job["username"]
+        tweet_text = job["tweet_text"]
 
-    async def _generate_and_reply_async(self, mention):
-        """Background async function to generate media and reply."""
         try:
-            # Get user info again for the async context
-            user = self.client.get_user(id=mention.author_id)
-            username = user.data.username
+            if username is None:
+                username = await self.get_username_async(job["author_id"])
+
+            # Start fetching the profile pictures the agent is likely to ask for,
+            # so the downloads overlap with the agent's first planning turn.
+            me = await self.get_me_async()
+            start_profile_prefetch(
+                extract_handles_from_tweet(tweet_text, me.data.username, CLASSIC_MEMES)
+            )
 
             # Generate media using async agent
-            media_path = await self.generate_response_media_async(mention)
-
-            if media_path and os.path.exists(media_path):
-                # Reply with medi
-                self.reply_with_media(mention.id, username, media_path)
+            media_path = await self.generate_response_media_async(tweet_text, username)
+
+            media_store = get_media_store()
+            if media_path and media_store.exists(media_path):
+                # Reply with media, uploading generated images straight from memory
+                await self.reply_with_media_async(
+                    mention_id,
+                    username,
+                    media_path,
+                    media_data=media_store.get(media_path),
+                )
+                media_store.discard(media_path)
                 logger.info(f"Successfully replied to @{username}")
 
                 # Update database with final media path
-                self._update_processed_mention(mention.id, media_path)
+                await self.processed_mentions.set_result(mention_id, media_path)
+                await self.generation_jobs.mark_done(mention_id, media_path)
 
                 # Update bot statistics
-                self.bot_state.increment_processed_count()
+                await self.bot_state.increment_processed_count()
 
             else:
-                logger.error(f"Failed to generate image for mention {mention.id}")
+                logger.error(f"Failed to generate image for mention {mention_id}")
                 # Update status to indicate failure
-                self._update_processed_mention(mention.id, None)
+                await self.processed_mentions.set_result(mention_id, None)
+                await self.generation_jobs.mark_failed(mention_id, "no media generated")
 
         except Exception as e:
-            logger.error(f"Async processing failed for mention {mention.id}: {e}")
+            logger.error(f"Async processing failed for mention {mention_id}: {e}")
             # Mark as failed
-            self._update_processed_mention(mention.id, None)
-
-    def _update_processed_mention(self, mention_id: str, image_path: str | None):
-        """Update an already processed mention with final image path."""
-        try:
-            # Update the existing record with final image path
-            self.processed_mentions.collection.update_one(
-                {"mention_id": mention_id},
-                {
-                    "$set": {
-                        "image_path": image_path,
-                        "status": "completed" if image_path else "failed",
-                    }
-                },
-            )
-        except Exception as e:
-            logger.error(f"Error updating processed mention {mention_id}: {e}")
+            await self.processed_mentions.set_result(mention_id, None)
+            await self.generation_jobs.mark_failed(mention_id, str(e))
 
-    async def generate_response_media_async(self, mention) -> str | None:
+    async def generate_response_media_async(
+        self, tweet_text: str, username: str
+    ) -> str | None:
         """Generate an AI image/video based on the mention content using OpenAI agent."""
         try:
             if not self.image_agent:
                 logger.error("Agent not initialized")
                 return None
 
-            # Extract username from mention
-            user = self.client.get_user(id=mention.author_id)
-            username = user.data.username
+            me_username = (await self.get_me_async()).data.username
 
             # Create prompt from mention
             prompt = build_prompt_from_tweet(
-                tweet=mention.text,
+                tweet=tweet_text,
                 author_username=username,
-                me_username=self.get_me().data.username,
+                me_username=me_username,
             )
             logger.info(f"Generating image with prompt: {prompt}")
 
@@ -208,6 +490,21 @@ class TwitterBot(TwitterClient):
             return None
 
 
+async def run_bot(bot: TwitterBot) -> None:
+    """Run the bot, closing the shared HTTP clients before the event loop ends."""
+    try:
+        # INGEST_MODE=webhook receives mentions pushed by the Account Activity API
+        # instead of polling for them.
+        if os.getenv("INGEST_MODE", "poll").lower() == "webhook":
+            await bot.start_webhook(
+                host=os.getenv("WEBHOOK_HOST", "0.0.0.0"),
+                port=int(os.getenv("WEBHOOK_PORT", "8080")),
+            )
+        else:
+            await bot.start_polling()
+    finally:
+        await close_clients()
+
+
 if __name__ == "__main__":
-    bot = TwitterBot()
-    asyncio.run(bot.start_polling())
+    asyncio.run(run_bot(TwitterBot()))
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for Twitter's Account Activity API: sends a signed mention event
+(or a CRC challenge) to a running webhook server, e.g. INGEST_MODE=webhook python main.py
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any
+
+import requests
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from backend.webhook import SIGNATURE_HEADER, sign  # noqa: E402
+
+load_dotenv()
+
+
+def fake_tweet_id() -> str:
+    """Generate a snowflake-like tweet ID that increases with time."""
+    return str((int(time.time() * 1000) - 1288834974657) << 22)
+
+
+def build_mention_event(
+    bot_id: str, bot_username: str, author_id: str, author_username: str, text: str
+) -> dict[str, Any]:
+    """Build a tweet_create_events payload for a tweet mentioning the bot."""
+    return {
+        "for_user_id": bot_id,
+        "tweet_create_events": [
+            {
+                "id_str": fake_tweet_id(),
+                "text": f"@{bot_username} {text}",
+                "user": {"id_str": author_id, "screen_name": author_username},
+                "in_reply_to_status_id_str": None,
+                "in_reply_to_user_id_str": bot_id,
+                "entities": {
+                    "user_mentions": [
+                        {"id_str": bot_id, "screen_name": bot_username},
+                    ]
+                },
+            }
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://localhost:8080/webhooks/twitter")
+    parser.add_argument("--crc", action="store_true", help="send a CRC challenge")
+    parser.add_argument("--bot-id", required="--crc" not in sys.argv)
+    parser.add_argument("--bot-username", default="memery_labs")
+    parser.add_argument("--author-id", default="12345")
+    parser.add_argument("--author-username", default="test_user")
+    parser.add_argument("--text", default="create an image of hosico flying")
+    args = parser.parse_args()
+
+    consumer_secret = os.getenv("TWITTER_API_SECRET")
+    if not consumer_secret:
+        print("Error: TWITTER_API_SECRET must be set in .env")
+        return
+
+    if args.crc:
+        response = requests.get(args.url, params={"crc_token": "test"}, timeout=10)
+        expected = sign(consumer_secret, b"test")
+        ok = response.ok and response.json().get("response_token") == expected
+        print(f"CRC {'ok' if ok else 'failed'}: {response.status_code} {response.text}")
+        return
+
+    event = build_mention_event(
+        args.bot_id,
+        args.bot_username,
+        args.author_id,
+        args.author_username,
+        args.text,
+    )
+    body = json.dumps(event).encode("utf-8")
+    response = requests.post(
+        args.url,
+        data=body,
+        headers={
+            "Content-Type": "application/json",
+            SIGNATURE_HEADER: sign(consumer_secret, body),
+        },
+        timeout=30,
+    )
+    print(f"Sent mention event: {response.status_code} {response.text}")
+
+
+if __name__ == "__main__":
+    main()
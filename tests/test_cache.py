@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+import pytest
+
+from tools.cache import DiskCache, SingleFlight
+
+
+def test_disk_cache_round_trip(tmp_path) -> None:
+    cache = DiskCache(str(tmp_path), max_bytes=1024)
+
+    entry = cache.put("image:a", b"abc", meta={"url": "a"}, suffix=".jpg")
+    assert cache.read_bytes(entry) == b"abc"
+    path = cache.path_for(entry)
+    assert path is not None and path.endswith(".jpg")
+
+    # The index survives a new cache instance over the same directory
+    reloaded = DiskCache(str(tmp_path), max_bytes=1024)
+    hit = reloaded.get("image:a")
+    assert hit is not None
+    assert hit.meta == {"url": "a"}
+    assert reloaded.read_bytes(hit) == b"abc"
+
+
+def test_disk_cache_ttl_and_negative_entries(tmp_path) -> None:
+    cache = DiskCache(str(tmp_path), max_bytes=1024)
+
+    cache.put("user:missing", meta={"missing": True}, ttl=0.05)
+    entry = cache.get("user:missing")
+    assert entry is not None and entry.meta["missing"]
+    assert cache.path_for(entry) is None
+
+    time.sleep(0.1)
+    assert cache.get("user:missing") is None
+
+
+def test_disk_cache_lru_eviction(tmp_path) -> None:
+    cache = DiskCache(str(tmp_path), max_bytes=10)
+
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    assert cache.get("a") is not None  # "b" is now least recently used
+
+    cache.put("c", b"1234")
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert cache.total_bytes <= 10
+
+
+def test_disk_cache_hits_do_not_rewrite_index(tmp_path, monkeypatch) -> None:
+    cache = DiskCache(str(tmp_path), max_bytes=1024)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+
+    saves = []
+    monkeypatch.setattr(cache, "_save_index", lambda: saves.append(1))
+    for _ in range(10):
+        assert cache.get("a") is not None
+    assert saves == []
+    monkeypatch.undo()
+
+    # Recency is persisted on flush
+    cache.flush()
+    reloaded = DiskCache(str(tmp_path), max_bytes=1024)
+    assert list(reloaded._entries) == ["b", "a"]
+
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_concurrent_calls() -> None:
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch() -> str:
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert "key" not in flight
+
+    # Once finished, the next call starts afresh
+    await flight.do("key", fetch)
+    assert len(calls) == 2
@@ -1,4 +1,19 @@
-from backend.database.models import BotState, ProcessedMention
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+import pytest
+
+from backend.database.async_models import (
+    AsyncBotState,
+    AsyncGenerationJob,
+    AsyncProcessedMention,
+)
+from backend.database.migrations import (
+    MIGRATIONS,
+    apply_migrations,
+    get_applied_versions,
+)
+from backend.database.models import BotState, GenerationJob, ProcessedMention
 
 
 def test_bot_state():
@@ -31,6 +46,11 @@ def test_processed_mentions():
         "image_path": "/path/to/test/image.png",
     }
 
+    # Start from a clean slate, since mention_id is unique
+    processed_mentions.collection.delete_one(
+        {"mention_id": test_mention_data["mention_id"]}
+    )
+
     success = processed_mentions.mark_as_processed(**test_mention_data)
     assert success, "Failed to mark mention as processed"
 
@@ -41,3 +61,192 @@ def test_processed_mentions():
     # Test getting processed mentions
     recent_mentions = processed_mentions.get_processed_mentions(limit=5)
     assert isinstance(recent_mentions, list), "Should return list of mentions"
+
+
+def test_migrations():
+    """Test that migrations apply once and create the mention indexes"""
+    apply_migrations()
+
+    # Everything is applied, so a second run is a no-op
+    assert apply_migrations() == [], "Migrations should only apply once"
+    assert get_applied_versions() >= {m.version for m in MIGRATIONS}
+
+    processed_mentions = ProcessedMention()
+    indexes = processed_mentions.collection.index_information()
+    assert indexes["mention_id_unique"]["unique"], "mention_id should be unique"
+    assert "status_processed_at" in indexes, "Missing status/processed_at index"
+
+    # The unique index rejects a second record of the same mention
+    mention_id = "1111111111111111111"
+    processed_mentions.collection.delete_one({"mention_id": mention_id})
+    assert processed_mentions.mark_as_processed(mention_id, "test_user", "Hi bot!")
+    assert not processed_mentions.mark_as_processed(mention_id, "test_user", "Hi bot!")
+
+
+def test_batch_processed_mentions():
+    """Test batch dedup and bulk marking of mentions"""
+    processed_mentions = ProcessedMention()
+
+    mention_ids = ["2222222222222222221", "2222222222222222222"]
+    processed_mentions.collection.delete_many({"mention_id": {"$in": mention_ids}})
+    assert processed_mentions.get_processed_ids(mention_ids) == set()
+
+    records = [
+        {
+            "mention_id": mention_id,
+            "author_id": "42",
+            "username": "test_user",
+            "tweet_text": "Hello bot!",
+        }
+        for mention_id in mention_ids
+    ]
+    recorded = processed_mentions.mark_many_as_processing(records[:1])
+    assert recorded == {mention_ids[0]}, "First mention should be recorded"
+
+    # Mentions already recorded are left out of the result
+    recorded = processed_mentions.mark_many_as_processing(records)
+    assert recorded == {mention_ids[1]}, "Only the new mention should be recorded"
+    assert processed_mentions.get_processed_ids(mention_ids) == set(mention_ids)
+
+
+def test_stale_processing_pages_oldest_first():
+    """Stale mentions come back oldest first, and paging reaches all of them"""
+    processed_mentions = ProcessedMention()
+
+    mention_ids = [f"44444444444444444{i:02d}" for i in range(7)]
+    processed_mentions.collection.delete_many({"mention_id": {"$in": mention_ids}})
+    start = datetime(2000, 1, 1, tzinfo=UTC)
+    processed_mentions.collection.insert_many(
+        [
+            {
+                "mention_id": mention_id,
+                "username": "test_user",
+                "tweet_text": "Hello bot!",
+                "image_path": "processing",
+                "status": "processing",
+                "processed_at": start + timedelta(minutes=i),
+            }
+            for i, mention_id in enumerate(mention_ids)
+        ]
+    )
+
+    limit = 3
+    stale: list[dict[str, Any]] = []
+    while page := processed_mentions.get_stale_processing(
+        600, limit=limit, skip=len(stale)
+    ):
+        assert len(page) <= limit
+        stale.extend(page)
+
+    ours = [doc["mention_id"] for doc in stale if doc["mention_id"] in mention_ids]
+    assert ours == mention_ids, "Every stale mention should be returned, oldest first"
+    processed_at = [doc["processed_at"] for doc in stale]
+    assert processed_at == sorted(processed_at)
+
+    processed_mentions.collection.delete_many({"mention_id": {"$in": mention_ids}})
+
+
+@pytest.mark.asyncio
+async def test_async_models():
+    """Test that the async models read what the sync models write"""
+    bot_state = AsyncBotState()
+    test_mention_id = "3333333333333333333"
+    assert await bot_state.set_last_mention_id(test_mention_id)
+    assert BotState().get_last_mention_id() == test_mention_id
+
+    processed_mentions = AsyncProcessedMention()
+    await processed_mentions.collection.delete_one({"mention_id": test_mention_id})
+    assert await processed_mentions.mark_as_processed(
+        test_mention_id, "test_user", "Hello bot!", image_path="processing"
+    )
+    assert ProcessedMention().is_processed(test_mention_id)
+
+    assert await processed_mentions.set_result(test_mention_id, "/path/to/image.png")
+    assert await processed_mentions.get_processed_ids([test_mention_id]) == {
+        test_mention_id
+    }
+
+
+# Queue tests claim and requeue every job in their collection, so they run on
+# their own collection rather than the bot's queue.
+TEST_JOBS_COLLECTION = "generation_jobs_test"
+
+
+def _job_records(mention_ids: list[str]) -> list[dict[str, Any]]:
+    start = datetime(1990, 1, 1, tzinfo=UTC)
+    return [
+        {
+            "mention_id": mention_id,
+            "author_id": "42",
+            "username": "test_user",
+            "tweet_text": "Hello bot!",
+            "created_at": start + timedelta(minutes=i),
+        }
+        for i, mention_id in enumerate(mention_ids)
+    ]
+
+
+def test_generation_jobs():
+    """Test queueing, claiming, requeueing and failing generation jobs"""
+    jobs = GenerationJob(collection_name=TEST_JOBS_COLLECTION)
+    jobs.collection.drop()
+    mention_ids = ["5555555555555555551", "5555555555555555552"]
+
+    assert jobs.enqueue_many(_job_records(mention_ids))
+    # Queueing the same mentions again is a no-op
+    assert jobs.enqueue_many(_job_records(mention_ids))
+    assert jobs.count_pending() == 2
+
+    # Jobs are claimed oldest first
+    job = jobs.claim_next()
+    assert job is not None
+    assert job["mention_id"] == mention_ids[0]
+    assert job["status"] == "running"
+    assert job["attempts"] == 1
+    assert jobs.count_pending() == 2
+
+    # A restart puts the running job back in the queue
+    assert jobs.requeue_running() == 1
+    assert jobs.collection.count_documents({"status": "queued"}) == 2
+
+    # Once claimed max_attempts times, an interrupted job is failed instead
+    job = jobs.claim_next()
+    assert job is not None and job["attempts"] == 2
+    assert jobs.fail_exhausted(max_attempts=3) == []
+    jobs.requeue_running()
+    job = jobs.claim_next()
+    assert job is not None and job["attempts"] == 3
+    assert jobs.fail_exhausted(max_attempts=3) == [mention_ids[0]]
+    assert jobs.collection.count_documents({"status": "failed"}) == 1
+
+    assert jobs.mark_done(mention_ids[1], "/path/to/image.png")
+    assert jobs.count_pending() == 0
+
+    jobs.collection.drop()
+
+
+@pytest.mark.asyncio
+async def test_async_generation_jobs():
+    """Test that the async job queue shares its jobs with the sync model"""
+    jobs = AsyncGenerationJob(collection_name=TEST_JOBS_COLLECTION)
+    await jobs.collection.drop()
+    mention_ids = ["6666666666666666661", "6666666666666666662"]
+
+    assert await jobs.enqueue_many(_job_records(mention_ids))
+    assert await jobs.count_pending() == 2
+    sync_jobs = GenerationJob(collection_name=TEST_JOBS_COLLECTION)
+    assert sync_jobs.collection.count_documents({"status": "queued"}) == 2
+
+    job = await jobs.claim_next()
+    assert job is not None
+    assert job["mention_id"] == mention_ids[0]
+    assert job["attempts"] == 1
+
+    assert await jobs.requeue_running() == 1
+    job = await jobs.claim_next()
+    assert job is not None and job["mention_id"] == mention_ids[0]
+    assert await jobs.fail_exhausted(max_attempts=2) == [mention_ids[0]]
+    assert await jobs.mark_failed(mention_ids[1], "test")
+    assert await jobs.count_pending() == 0
+
+    await jobs.collection.drop()
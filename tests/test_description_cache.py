@@ -0,0 +1,71 @@
+import io
+
+from PIL import Image, ImageDraw
+
+from tools.description_cache import DescriptionCache, dhash, hamming_distance
+
+
+def _make_image(size: tuple[int, int], fmt: str = "PNG") -> bytes:
+    img = Image.new("RGB", size, (30, 120, 200))
+    draw = ImageDraw.Draw(img)
+    draw.ellipse(
+        (size[0] // 4, size[1] // 4, size[0] * 3 // 4, size[1] * 3 // 4),
+        fill=(250, 200, 40),
+    )
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def test_dhash_matches_resized_and_reencoded_images() -> None:
+    original = dhash(_make_image((400, 400)))
+    resized = dhash(_make_image((200, 200), fmt="JPEG"))
+
+    assert len(original) == 16
+    assert hamming_distance(original, resized) <= 4
+
+
+def test_description_cache_reuses_near_identical_images(tmp_path) -> None:
+    cache = DescriptionCache(str(tmp_path), max_distance=4)
+
+    image_hash = dhash(_make_image((400, 400)))
+    assert cache.lookup(image_hash) is None
+
+    cache.store(image_hash, "a yellow circle on a blue background")
+    near_hash = dhash(_make_image((200, 200), fmt="JPEG"))
+    assert cache.lookup(near_hash) == "a yellow circle on a blue background"
+
+    # Hit/miss counts are persisted with the store on flush
+    cache.flush()
+    stats = DescriptionCache(str(tmp_path)).stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+
+
+def test_description_cache_lookups_do_not_rewrite_store(tmp_path) -> None:
+    cache = DescriptionCache(str(tmp_path))
+    cache.store("0" * 16, "a blank picture")
+    store_path = tmp_path / DescriptionCache.STORE_FILE
+    written = store_path.stat().st_mtime_ns
+
+    store_path.unlink()
+    assert cache.lookup("0" * 16) == "a blank picture"
+    assert cache.lookup("f" * 16) is None
+    assert not store_path.exists()
+
+    cache.flush()
+    assert store_path.stat().st_mtime_ns >= written
+
+
+def test_description_cache_evicts_least_recently_used(tmp_path) -> None:
+    cache = DescriptionCache(str(tmp_path), max_distance=0, max_entries=2)
+    cache.store("0" * 16, "first")
+    cache.store("1" * 16, "second")
+    assert cache.lookup("0" * 16) == "first"
+
+    cache.store("2" * 16, "third")
+
+    assert cache.lookup("1" * 16) is None
+    assert cache.lookup("0" * 16) == "first"
+    assert DescriptionCache(str(tmp_path)).stats()["entries"] == 2
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+from PIL import Image
+
+from tools import image_generation
+from tools.cache import DiskCache
+from tools.image_encoding import EncodedImage
+from tools.image_generation import (
+    _create_composite_image_impl,
+    generation_cache_key,
+    normalize_prompt,
+)
+from tools.media_store import MediaStore
+
+
+def test_generation_cache_key_uses_prompt_and_content(tmp_path):
+    """Keys ignore prompt formatting and input paths, but not input content"""
+    a, b, c = (str(tmp_path / name) for name in ("a.png", "b.png", "c.png"))
+    Image.new("RGB", (8, 8), "red").save(a)
+    Image.new("RGB", (8, 8), "red").save(b)
+    Image.new("RGB", (8, 8), "blue").save(c)
+
+    assert normalize_prompt("  Put HIM in  space! ") == "put him in space"
+    assert generation_cache_key("Put him in space.", [a]) == generation_cache_key(
+        "put him  in space", [b]
+    )
+    assert generation_cache_key("put him in space", [a]) != generation_cache_key(
+        "put him in space", [c]
+    )
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_generate_once(tmp_path, monkeypatch):
+    """Concurrent identical requests share a generation, later ones hit the cache"""
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=10 * 1024**2)
+    monkeypatch.setattr(image_generation, "_generation_cache", cache)
+    store = MediaStore(archive=False)
+    monkeypatch.setattr(image_generation, "get_media_store", lambda: store)
+
+    input_path = str(tmp_path / "input.png")
+    Image.new("RGB", (8, 8), "red").save(input_path)
+
+    calls = []
+
+    async def fake_generate(prompt, image_paths, image_data=None):
+        calls.append(prompt)
+        await asyncio.sleep(0.01)
+        return EncodedImage(b"jpeg bytes", "JPEG", 80, 45.0, 100)
+
+    monkeypatch.setattr(image_generation, "_generate_composite_image", fake_generate)
+
+    outputs = [str(tmp_path / f"out{i}.png") for i in range(3)]
+    results = await asyncio.gather(
+        _create_composite_image_impl("draw a cat", [input_path], outputs[0]),
+        _create_composite_image_impl("Draw  a Cat", [input_path], outputs[1]),
+    )
+    assert len(calls) == 1
+    assert results == [str(tmp_path / "out0.jpg"), str(tmp_path / "out1.jpg")]
+
+    result = await _create_composite_image_impl("draw a cat", [input_path], outputs[2])
+    assert len(calls) == 1
+    assert result == str(tmp_path / "out2.jpg")
+    assert store.get(result) == b"jpeg bytes"
+
+    # The same picture of another user is a different request
+    other_path = str(tmp_path / "other_profile.png")
+    Image.new("RGB", (8, 8), "red").save(other_path)
+    await _create_composite_image_impl("draw a cat", [other_path], outputs[2])
+    assert len(calls) == 2
+    assert "other_profile.png" in calls[1]
@@ -0,0 +1,35 @@
+import io
+
+from PIL import Image
+
+from tools.image_encoding import encode_for_upload, psnr
+
+TEST_IMAGE = "tests/test_media/moon_astronauts.png"
+
+
+def _load_test_image() -> Image.Image:
+    with Image.open(TEST_IMAGE) as img:
+        return img.convert("RGB").resize((768, 512), Image.Resampling.BICUBIC)
+
+
+def test_encode_for_upload_meets_floor_and_budget() -> None:
+    img = _load_test_image()
+
+    encoded = encode_for_upload(img, max_bytes=2_000_000, min_psnr=38)
+
+    assert len(encoded.data) <= 2_000_000
+    assert encoded.psnr >= 38
+    assert encoded.bytes_saved > 0, "a lossy format should beat the PNG"
+
+    # The reported PSNR matches the encoded bytes
+    with Image.open(io.BytesIO(encoded.data)) as decoded:
+        assert abs(psnr(img, decoded.convert("RGB")) - encoded.psnr) < 1e-6
+
+
+def test_encode_for_upload_budget_wins_over_floor() -> None:
+    img = _load_test_image()
+
+    encoded = encode_for_upload(img, max_bytes=20_000, min_psnr=60)
+
+    assert len(encoded.data) <= 20_000
+    assert encoded.format in ("JPEG", "WEBP")
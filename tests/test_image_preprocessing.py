@@ -0,0 +1,111 @@
+import io
+import os
+from collections import OrderedDict
+
+from PIL import Image, ImageDraw
+
+from tools import image_preprocessing
+from tools.cache import DiskCache
+from tools.image_preprocessing import (
+    normalize_for_edit,
+    prepare_edit_input,
+    source_hash,
+)
+
+
+def _make_photo(size: tuple[int, int], mode: str = "RGB") -> Image.Image:
+    img = Image.new(mode, size, (30, 120, 200, 255)[: len(mode)])
+    draw = ImageDraw.Draw(img)
+    draw.ellipse(
+        (size[0] // 4, size[1] // 4, size[0] * 3 // 4, size[1] * 3 // 4),
+        fill=(250, 200, 40, 255)[: len(mode)],
+    )
+    return img
+
+
+def test_normalize_for_edit_downscales_and_strips_metadata():
+    """Large inputs are shrunk to the edit size and lose their EXIF data"""
+    exif = Image.Exif()
+    exif[0x010F] = "Test Camera"  # Make
+    buffer = io.BytesIO()
+    _make_photo((3000, 2000)).save(buffer, format="JPEG", exif=exif)
+
+    data, image_format, size = normalize_for_edit(buffer.getvalue(), max_size=1536)
+
+    assert size == (1536, 1024)
+    with Image.open(io.BytesIO(data)) as img:
+        assert img.format == image_format
+        assert img.size == (1536, 1024)
+        assert not img.getexif()
+
+
+def test_normalize_for_edit_keeps_transparency():
+    """Images with an alpha channel stay PNG with their alpha"""
+    buffer = io.BytesIO()
+    _make_photo((400, 300), mode="RGBA").save(buffer, format="PNG")
+
+    data, image_format, size = normalize_for_edit(buffer.getvalue(), max_size=1536)
+
+    assert image_format == "PNG"
+    assert size == (400, 300)
+    with Image.open(io.BytesIO(data)) as img:
+        assert img.mode == "RGBA"
+
+
+def test_prepare_edit_input_caches_by_content(tmp_path, monkeypatch):
+    """Identical inputs are preprocessed once, whatever their path"""
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=10 * 1024**2)
+    monkeypatch.setattr(image_preprocessing, "_preprocess_cache", cache)
+
+    calls = []
+    original = image_preprocessing.normalize_for_edit
+
+    def counting_normalize(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(image_preprocessing, "normalize_for_edit", counting_normalize)
+
+    paths = [tmp_path / "a.jpg", tmp_path / "b.jpg"]
+    for path in paths:
+        _make_photo((2000, 2000)).save(path, format="JPEG")
+
+    first = prepare_edit_input(str(paths[0]), max_size=512)
+    second = prepare_edit_input(str(paths[1]), max_size=512)
+
+    assert len(calls) == 1
+    assert first.path == second.path
+    assert (first.width, first.height) == (512, 512)
+    assert first.prepared_bytes < first.source_bytes
+
+    # The prepared bytes are held, so evicting the cached file doesn't lose them
+    assert first.data == second.data and len(first.data) == first.prepared_bytes
+    cache.max_bytes = 1
+    cache.put("other", b"evicts everything older")
+    assert not os.path.exists(first.path)
+    assert len(first.data) == first.prepared_bytes
+
+
+def test_file_hashes_are_bounded_by_path(tmp_path, monkeypatch):
+    """Rewriting a file replaces its hash, and only the newest paths are kept"""
+    monkeypatch.setattr(image_preprocessing, "_file_hashes", OrderedDict())
+    monkeypatch.setattr(image_preprocessing, "FILE_HASHES_MAX_ITEMS", 2)
+
+    path = tmp_path / "pfp.jpg"
+    path.write_bytes(b"first")
+    first, _ = source_hash(str(path))
+    path.write_bytes(b"second picture")
+    second, data = source_hash(str(path))
+
+    assert first != second and data == b"second picture"
+    assert len(image_preprocessing._file_hashes) == 1
+    assert source_hash(str(path)) == (second, None)
+
+    for name in ("a.jpg", "b.jpg"):
+        (tmp_path / name).write_bytes(name.encode())
+        source_hash(str(tmp_path / name))
+    assert str(path) not in image_preprocessing._file_hashes
+    assert len(image_preprocessing._file_hashes) == 2
+
+    # Content held in memory is hashed as given, without touching the disk
+    assert source_hash("not/on/disk.png", b"first") == (first, b"first")
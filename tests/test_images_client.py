@@ -0,0 +1,118 @@
+import os
+
+import httpx
+import pytest
+
+from tools import clients, images_client
+from tools.images_client import ImagesClient, retry_delay
+
+
+def _open_fd_count() -> int:
+    return len(os.listdir("/proc/self/fd"))
+
+
+@pytest.mark.asyncio
+async def test_images_client_retries_and_closes_inputs(tmp_path, monkeypatch):
+    """Rate-limited requests are retried with the full upload, honoring Retry-After"""
+    path = tmp_path / "input.png"
+    path.write_bytes(b"input image bytes")
+
+    bodies = []
+    statuses = iter([429, 503, 200])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(request.read())
+        return httpx.Response(next(statuses), headers={"Retry-After": "2"})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(images_client, "get_http_client", lambda: client)
+
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(images_client.asyncio, "sleep", fake_sleep)
+
+    fds_before = _open_fd_count()
+    response = await ImagesClient(max_retries=3).edit(
+        "a prompt", [str(path)], model="gpt-image-1"
+    )
+    await client.aclose()
+
+    assert response.status_code == 200
+    assert delays == [2.0, 2.0]
+    # Every attempt sends the whole file, and the handle is closed afterwards
+    assert len(bodies) == 3
+    assert all(b"input image bytes" in body for body in bodies)
+    assert _open_fd_count() == fds_before
+
+
+@pytest.mark.asyncio
+async def test_images_client_gives_up_after_max_retries(monkeypatch):
+    """The last error response is returned once the retries are used up"""
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(500)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(images_client, "get_http_client", lambda: client)
+
+    async def fake_sleep(delay):
+        pass
+
+    monkeypatch.setattr(images_client.asyncio, "sleep", fake_sleep)
+
+    response = await ImagesClient(max_retries=2).edit("a prompt", [])
+    await client.aclose()
+
+    assert response.status_code == 500
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_images_client_sends_inputs_from_memory(monkeypatch):
+    """(filename, bytes) inputs are uploaded without touching the disk"""
+    bodies = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(request.read())
+        return httpx.Response(200)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(images_client, "get_http_client", lambda: client)
+
+    response = await ImagesClient().edit(
+        "a prompt", [("/evicted/input.webp", b"prepared image bytes")]
+    )
+    await client.aclose()
+
+    assert response.status_code == 200
+    assert b'filename="input.webp"' in bodies[0]
+    assert b"image/webp" in bodies[0]
+    assert b"prepared image bytes" in bodies[0]
+
+
+@pytest.mark.asyncio
+async def test_close_clients_closes_the_shared_pool():
+    """close_clients closes the pooled client; the next caller gets a new one"""
+    client = clients.get_http_client()
+    assert clients.get_http_client() is client
+
+    await clients.close_clients()
+
+    assert client.is_closed
+    assert clients.get_http_client() is not client
+    await clients.close_clients()
+
+
+def test_retry_delay_backoff():
+    """Without Retry-After the delay is jittered and capped"""
+    for attempt in range(10):
+        delay = retry_delay(attempt, base_delay=1.0, max_delay=8.0)
+        assert 0 <= delay <= min(8.0, 2**attempt)
+
+    response = httpx.Response(429, headers={"Retry-After": "120"})
+    assert retry_delay(0, response, max_delay=60.0) == 60.0
@@ -0,0 +1,43 @@
+import asyncio
+import os
+
+import pytest
+
+from tools.media_store import MediaStore
+
+
+@pytest.mark.asyncio
+async def test_media_store_writes_behind(tmp_path):
+    """Media is served from memory and archived to disk in the background"""
+    store = MediaStore(max_items=2)
+    path = str(tmp_path / "image.png")
+
+    store.put(path, b"png bytes")
+    assert store.get(path) == b"png bytes"
+    assert store.exists(path)
+
+    await store.flush()
+    with open(path, "rb") as f:
+        assert f.read() == b"png bytes"
+
+    # Once evicted from memory, the archived copy is read from disk
+    store.discard(path)
+    assert store.get(path) is None
+    assert store.read(path) == b"png bytes"
+
+
+def test_media_store_evicts_least_recently_used(tmp_path):
+    """The store keeps only the most recently used items in memory"""
+    store = MediaStore(max_items=2, archive=False)
+    paths = [str(tmp_path / f"{i}.png") for i in range(3)]
+
+    store.put(paths[0], b"0")
+    store.put(paths[1], b"1")
+    store.get(paths[0])
+    store.put(paths[2], b"2")
+
+    assert store.get(paths[1]) is None
+    assert store.get(paths[0]) == b"0"
+    assert not store.exists(paths[1]), "Nothing should be archived to disk"
+    assert not any(os.path.exists(path) for path in paths)
+    asyncio.run(store.flush())
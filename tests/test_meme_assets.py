@@ -0,0 +1,70 @@
+import os
+
+import pytest
+from PIL import Image
+
+from tools import image_preprocessing, meme_assets, x_profile
+from tools.cache import DiskCache
+from tools.image_selection import _select_local_image_impl
+from tools.meme_assets import MemeAssetIndex
+from tools.x_profile import _download_x_profile_picture_impl
+
+
+@pytest.fixture
+def memes_dir(tmp_path, monkeypatch):
+    """A memes directory with one classic meme, offline preprocessing and descriptions"""
+    directory = tmp_path / "memes"
+    (directory / "hosico").mkdir(parents=True)
+    Image.new("RGB", (400, 300), "orange").save(directory / "hosico" / "default.jpg")
+
+    cache = DiskCache(str(tmp_path / "cache"), max_bytes=10 * 1024**2)
+    monkeypatch.setattr(image_preprocessing, "_preprocess_cache", cache)
+
+    async def fake_describe(image_data):
+        return "an orange cat"
+
+    monkeypatch.setattr(meme_assets, "describe_image", fake_describe)
+    return directory
+
+
+@pytest.mark.asyncio
+async def test_meme_asset_index_loads_and_refreshes(memes_dir):
+    """Assets are indexed with their metadata and reloaded when the file changes"""
+    index = MemeAssetIndex(str(memes_dir), refresh_interval=0)
+    await index.warm()
+
+    assert index.names() == ["hosico"]
+    asset = index.get("Hosico")
+    assert asset is not None
+    assert (asset.width, asset.height) == (400, 300)
+    assert asset.description == "an orange cat"
+    assert asset.prepared is not None and os.path.exists(asset.prepared.path)
+    assert index.for_handle("@hosico_on_sol") is asset
+    assert index.for_handle("bonk_inu") is None
+
+    # Unchanged files are not reloaded
+    assert index.get("hosico") is asset
+
+    path = memes_dir / "hosico" / "default.jpg"
+    Image.new("RGB", (200, 100), "black").save(path)
+    os.utime(path, ns=(asset.mtime_ns + 10**9, asset.mtime_ns + 10**9))
+    reloaded = index.get("hosico")
+    assert reloaded is not None
+    assert (reloaded.width, reloaded.height) == (200, 100)
+    assert reloaded.content_hash != asset.content_hash
+
+
+@pytest.mark.asyncio
+async def test_classic_memes_resolve_locally(memes_dir, monkeypatch):
+    """Classic meme handles and names resolve without Twitter credentials or network"""
+    index = MemeAssetIndex(str(memes_dir))
+    monkeypatch.setattr(meme_assets, "_meme_asset_index", index)
+    monkeypatch.delenv("TWITTER_BEARER_TOKEN", raising=False)
+    monkeypatch.setattr(x_profile, "load_dotenv", lambda: None)
+
+    result = await _download_x_profile_picture_impl("Hosico_on_sol")
+
+    assert result.filepath == str(memes_dir / "hosico" / "default.jpg")
+    assert result.description == "an orange cat"
+    assert _select_local_image_impl("hosico") == result.filepath
+    assert _select_local_image_impl("unknown") == ""
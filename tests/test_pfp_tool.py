@@ -1,8 +1,10 @@
+import asyncio
 import os
 
 import pytest
 
-from tools.x_profile import _download_x_profile_picture_impl
+from tools import x_profile
+from tools.x_profile import _download_x_profile_picture_impl, _ProfileContent
 
 
 @pytest.mark.asyncio
@@ -34,3 +36,39 @@ async def test_download_x_profile_picture() -> None:
         # If download failed, we still want to know about it
         print(f"Failed to download profile picture for {user_name}")
         # Don't fail the test as this could be due to API limits, network issues, etc.
+
+
+@pytest.mark.asyncio
+async def test_concurrent_downloads_share_one_fetch(tmp_path, monkeypatch) -> None:
+    """Concurrent calls for one handle share a fetch and write a complete file"""
+    monkeypatch.setenv("TWITTER_BEARER_TOKEN", "test-token")
+    calls = []
+
+    async def fake_fetch(username, resolution=None):
+        calls.append(username)
+        await asyncio.sleep(0.01)
+        return _ProfileContent(
+            "https://pbs.twimg.com/profile_images/1/photo.jpg",
+            b"jpeg bytes",
+            "a cat",
+        )
+
+    monkeypatch.setattr(x_profile, "_fetch_profile_content", fake_fetch)
+
+    results = await asyncio.gather(
+        *(
+            _download_x_profile_picture_impl(name, output_dir=str(tmp_path))
+            for name in ["hosico_cat", "Hosico_Cat", "hosico_cat"]
+        )
+    )
+
+    assert len(calls) == 1
+    assert all(result.description == "a cat" for result in results)
+    assert results[0].filepath is not None
+    with open(results[0].filepath, "rb") as f:
+        assert f.read() == b"jpeg bytes"
+    # No temporary files are left behind
+    assert sorted(os.listdir(tmp_path)) == [
+        "Hosico_Cat_profile.jpg",
+        "hosico_cat_profile.jpg",
+    ]
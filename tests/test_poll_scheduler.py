@@ -0,0 +1,44 @@
+import time
+
+from backend.poll_scheduler import AdaptivePollScheduler
+from backend.twitter_client import RateLimit
+
+
+def test_interval_adapts_to_mentions():
+    """The interval shrinks while mentions arrive and grows while idle"""
+    scheduler = AdaptivePollScheduler(
+        initial_interval=60, min_interval=15, max_interval=300
+    )
+
+    assert scheduler.record_poll(found=3) == 30
+    assert scheduler.record_poll(found=1) == 15
+    assert scheduler.record_poll(found=2) == 15, "Interval should stop at the minimum"
+
+    for _ in range(10):
+        scheduler.record_poll(found=0)
+    assert scheduler.interval == 300, "Interval should stop at the maximum"
+
+
+def test_interval_respects_rate_limit_budget():
+    """Polls are spread over the remaining budget, and wait for a reset when spent"""
+    scheduler = AdaptivePollScheduler(
+        initial_interval=30, min_interval=15, max_interval=300, reserve_calls=0
+    )
+    reset_at = time.time() + 600
+
+    # 10 calls left for 600 seconds: no faster than one poll per minute
+    delay = scheduler.record_poll(found=5, rate_limit=RateLimit(75, 10, reset_at))
+    assert 55 < delay <= 60
+
+    # A poll that paged through a backlog used 4 calls: 6 left at 4 per poll
+    delay = scheduler.record_poll(found=5, rate_limit=RateLimit(75, 6, reset_at))
+    assert scheduler.calls_per_poll == 4
+    assert 550 < delay <= 600
+
+    # Budget spent: wait out the window
+    delay = scheduler.record_poll(found=5, rate_limit=RateLimit(75, 0, reset_at))
+    assert delay > 590
+
+    metrics = scheduler.metrics()
+    assert metrics["rate_limit_remaining"] == 0
+    assert metrics["poll_interval"] == 15
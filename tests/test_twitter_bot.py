@@ -1,7 +1,11 @@
 import logging
 import os
+from types import SimpleNamespace
+from typing import Any
 
-from backend.twitter_client import TwitterClient
+import pytest
+
+from backend.twitter_client import TwitterClient, UserCache
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
@@ -72,6 +76,112 @@ class TestBot(TwitterClient):
             logger.error(f"❌ media upload failed: {e}")
 
 
+@pytest.mark.asyncio
+async def test_iter_mentions_async_drains_pages_oldest_first():
+    """Mentions from every page since since_id come back oldest first"""
+
+    class FakeAsyncClient:
+        # Three pages of mentions 9..1, served newest first like the API
+        pages = {None: ([9, 8, 7], "b"), "b": ([6, 5, 4], "c"), "c": ([3, 2, 1], None)}
+
+        def __init__(self):
+            self.session = None
+
+        async def get_users_mentions(self, pagination_token=None, **kwargs):
+            ids, next_token = self.pages[pagination_token]
+            data = [
+                SimpleNamespace(
+                    id=i,
+                    author_id=100 + i,
+                    in_reply_to_user_id=None,
+                    referenced_tweets=None,
+                )
+                for i in ids
+            ]
+            meta = {"next_token": next_token} if next_token else {}
+            return SimpleNamespace(data=data, includes={}, meta=meta)
+
+    client = TwitterClient.__new__(TwitterClient)
+    client.async_client = FakeAsyncClient()  # type: ignore[assignment]
+    client._me = SimpleNamespace(data=SimpleNamespace(id=1_000, username="bot"))
+
+    mentions = [m.id async for m in client.iter_mentions_async(since_id="0")]
+    assert mentions == list(range(1, 10))
+
+    # With a cap, the oldest mentions come first; the rest are left for the
+    # next call, which resumes after the checkpointed mention
+    mentions = [m.id async for m in client.iter_mentions_async(since_id="0", limit=5)]
+    assert mentions == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.asyncio
+async def test_get_newest_mention_id_async():
+    """The newest mention ID seeds a fresh checkpoint with a single small request"""
+
+    class FakeAsyncClient:
+        session = None
+        calls: list[dict[str, Any]] = []
+
+        async def get_users_mentions(self, **kwargs):
+            self.calls.append(kwargs)
+            data = [SimpleNamespace(id=42), SimpleNamespace(id=41)]
+            return SimpleNamespace(data=data, includes={}, meta={"newest_id": "42"})
+
+    client = TwitterClient.__new__(TwitterClient)
+    client.async_client = FakeAsyncClient()  # type: ignore[assignment]
+    client._me = SimpleNamespace(data=SimpleNamespace(id=1_000, username="bot"))
+
+    assert await client.get_newest_mention_id_async() == "42"
+    assert len(FakeAsyncClient.calls) == 1
+    assert FakeAsyncClient.calls[0]["max_results"] == 5
+    assert FakeAsyncClient.calls[0]["since_id"] is None
+
+
+@pytest.mark.asyncio
+async def test_included_users_fill_the_user_cache():
+    """Authors expanded into mention pages are resolved without a get_user call"""
+
+    class FakeAsyncClient:
+        session = None
+        user_lookups: list[int] = []
+
+        async def get_users_mentions(self, **kwargs):
+            data = [
+                SimpleNamespace(
+                    id=1,
+                    author_id=101,
+                    in_reply_to_user_id=None,
+                    referenced_tweets=None,
+                )
+            ]
+            users = [SimpleNamespace(id=101, username="alice")]
+            return SimpleNamespace(data=data, includes={"users": users}, meta={})
+
+        async def get_user(self, id):
+            self.user_lookups.append(id)
+            return SimpleNamespace(data=SimpleNamespace(username=f"user{id}"))
+
+    client = TwitterClient.__new__(TwitterClient)
+    client.async_client = FakeAsyncClient()  # type: ignore[assignment]
+    client._me = SimpleNamespace(data=SimpleNamespace(id=1_000, username="bot"))
+    client.user_cache = UserCache(maxsize=2)
+
+    mentions = [m async for m in client.iter_mentions_async(since_id="0")]
+    assert client.user_cache.get(mentions[0].author_id) == "alice"
+
+    # A hit skips the lookup; a miss looks the user up once, then is cached
+    assert await client.get_username_async(101) == "alice"
+    assert FakeAsyncClient.user_lookups == []
+    assert await client.get_username_async(202) == "user202"
+    assert await client.get_username_async(202) == "user202"
+    assert FakeAsyncClient.user_lookups == [202]
+
+    # The cache keeps only the maxsize most recently used users
+    client.user_cache.put(303, "carol")
+    assert client.user_cache.get(101) is None
+    assert len(client.user_cache) == 2
+
+
 def main():
     """Main function to run tests."""
     print("🤖 Twitter Bot Test Script")
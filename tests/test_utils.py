@@ -4,6 +4,7 @@ import os
 from utils import (
     build_character_instructions,
     build_prompt_from_tweet,
+    extract_handles_from_tweet,
     get_available_characters,
     get_output_directory,
     get_output_path,
@@ -67,3 +68,23 @@ def test_get_output_path():
     result = get_output_path("test.png")
     assert result.endswith("output_images/test.png")
     assert os.path.exists("output_images")  # Directory should be created
+
+
+def test_extract_handles_from_tweet():
+    classic_memes = {"hosico": "@Hosico_on_sol", "bonk": "@bonk_inu"}
+    tweet = (
+        "@memery_labs @iamkadense and @solporttom brainstorming in a conference "
+        "room, while bonk and Hosico playing with @IamKadense. email me@example.com"
+    )
+
+    handles = extract_handles_from_tweet(tweet, "memery_labs", classic_memes)
+
+    assert handles == ["iamkadense", "solporttom", "Hosico_on_sol", "bonk_inu"]
+
+
+def test_extract_handles_skips_non_ascii_names():
+    tweet = "@memery_labs draw @café and @über_cat with @solporttom"
+
+    handles = extract_handles_from_tweet(tweet, "memery_labs", {})
+
+    assert handles == ["solporttom"]
@@ -1,7 +1,14 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any
+
 import pytest
 from dotenv import load_dotenv
 
-from tools.video_generation import _image_to_video_generation_impl
+from tools.video_generation import (
+    VideoOperationTracker,
+    _image_to_video_generation_impl,
+)
 
 load_dotenv()
 
@@ -14,3 +21,68 @@ async def test_image_to_video_generation() -> None:
     )
 
     assert result, "video generation failed."
+
+
+class FakeOperations:
+    """Stand-in for client.aio.operations that finishes after a number of polls."""
+
+    def __init__(self, polls_until_done: dict[str, int]):
+        self.polls_until_done = polls_until_done
+        self.polls: dict[str, int] = {}
+
+    async def get(self, operation):
+        self.polls[operation.name] = self.polls.get(operation.name, 0) + 1
+        if operation.name == "malformed":
+            return SimpleNamespace(name=operation.name)
+        done = self.polls[operation.name] >= self.polls_until_done[operation.name]
+        return SimpleNamespace(name=operation.name, done=done)
+
+
+@pytest.mark.asyncio
+async def test_video_operation_tracker_polls_operations_concurrently() -> None:
+    operations = FakeOperations({"fast": 1, "slow": 3, "stuck": 10**6})
+    client = SimpleNamespace(aio=SimpleNamespace(operations=operations))
+    tracker = VideoOperationTracker(
+        client,  # type: ignore[arg-type]
+        initial_interval=0.01,
+        max_interval=0.02,
+        timeout=0.2,
+    )
+
+    results: list[Any] = await asyncio.gather(
+        *(
+            tracker.wait(SimpleNamespace(name=name, done=False))  # type: ignore[arg-type]
+            for name in ["fast", "slow", "stuck"]
+        ),
+        return_exceptions=True,
+    )
+
+    assert results[0].done and results[1].done
+    assert isinstance(results[2], TimeoutError)
+    assert operations.polls["slow"] == 3
+    assert len(tracker) == 0
+
+
+@pytest.mark.asyncio
+async def test_video_operation_tracker_survives_a_broken_operation() -> None:
+    operations = FakeOperations({"malformed": 1, "slow": 3})
+    client = SimpleNamespace(aio=SimpleNamespace(operations=operations))
+    tracker = VideoOperationTracker(
+        client,  # type: ignore[arg-type]
+        initial_interval=0.01,
+        max_interval=0.02,
+        timeout=1,
+    )
+
+    results: list[Any] = await asyncio.gather(
+        *(
+            tracker.wait(SimpleNamespace(name=name, done=False))  # type: ignore[arg-type]
+            for name in ["malformed", "slow"]
+        ),
+        return_exceptions=True,
+    )
+
+    assert isinstance(results[0], AttributeError)
+    assert results[1].done
+    assert operations.polls["slow"] == 3
+    assert len(tracker) == 0
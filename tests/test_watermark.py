@@ -1,6 +1,8 @@
 import shutil
 
-from tools.image_generation import add_watermark
+from PIL import Image, ImageChops
+
+from tools.image_generation import _watermark_sprite, add_watermark, watermark_image
 
 
 def test_add_watermark() -> None:
@@ -16,3 +18,29 @@ def test_add_watermark() -> None:
 
     assert result, "watermark addition failed."
     print(f"Watermarked image saved to: {output_path}")
+
+
+def test_watermark_image_reuses_sprite() -> None:
+    img = Image.new("RGB", (600, 400), (10, 120, 30))
+
+    first = watermark_image(img.copy())
+    hits = _watermark_sprite.cache_info().hits
+    second = watermark_image(img.copy())
+
+    assert _watermark_sprite.cache_info().hits == hits + 1, "sprite not cached"
+    assert first.tobytes() == second.tobytes()
+
+    # Only the bottom right corner is changed
+    changed = ImageChops.difference(img, first).getbbox()
+    assert changed is not None and changed[0] > 300 and changed[1] > 300
+
+
+def test_watermark_image_flattens_alpha() -> None:
+    img = Image.new("RGBA", (600, 400), (10, 120, 30, 0))
+
+    watermarked = watermark_image(img)
+
+    # Transparent pixels become white, and the source image is left untouched
+    assert watermarked.mode == "RGB"
+    assert watermarked.getpixel((0, 0)) == (255, 255, 255)
+    assert img.getpixel((0, 0)) == (10, 120, 30, 0)
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from backend.webhook import SIGNATURE_HEADER, create_webhook_app, parse_mentions, sign
+from scripts.send_webhook_event import build_mention_event
+
+SECRET = "test-consumer-secret"
+
+
+@pytest.mark.asyncio
+async def test_webhook_crc_and_events():
+    """The webhook answers CRC challenges and only accepts signed events"""
+    received = []
+
+    async def on_mentions(mentions):
+        received.extend(mentions)
+
+    app = create_webhook_app(SECRET, on_mentions)
+    async with TestClient(TestServer(app)) as client:
+        response = await client.get("/webhooks/twitter", params={"crc_token": "abc"})
+        assert (await response.json())["response_token"] == sign(SECRET, b"abc")
+
+        event = build_mention_event("1000", "bot", "42", "test_user", "draw a cat")
+        body = json.dumps(event).encode("utf-8")
+
+        response = await client.post(
+            "/webhooks/twitter", data=body, headers={SIGNATURE_HEADER: "sha256=bad"}
+        )
+        assert response.status == 403
+        assert received == []
+
+        response = await client.post(
+            "/webhooks/twitter",
+            data=body,
+            headers={SIGNATURE_HEADER: sign(SECRET, body)},
+        )
+        assert response.status == 200
+
+    assert len(received) == 1
+    mention = received[0]
+    assert mention.author_id == 42
+    assert mention.author_username == "test_user"
+    assert mention.text == "@bot draw a cat"
+
+
+def test_parse_mentions_skips_other_tweets():
+    """Only tweets mentioning the subscribed user are returned, oldest first"""
+    newer = build_mention_event("1000", "bot", "42", "a", "newer")
+    older = build_mention_event("1000", "bot", "43", "b", "older")
+    older["tweet_create_events"][0]["id_str"] = "1"
+    unrelated = build_mention_event("2000", "other", "44", "c", "unrelated")
+
+    payload = {
+        "for_user_id": "1000",
+        "tweet_create_events": newer["tweet_create_events"]
+        + unrelated["tweet_create_events"]
+        + older["tweet_create_events"],
+    }
+    mentions = parse_mentions(payload)
+    assert [m.author_username for m in mentions] == ["b", "a"]
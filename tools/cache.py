@@ -0,0 +1,292 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    filename: str | None
+    size: int
+    created_at: float
+    accessed_at: float
+    expires_at: float | None = None
+    meta: dict[str, Any] = field(default_factory=dict)
+
+    def is_expired(self, now: float | None = None) -> bool:
+        if self.expires_at is None:
+            return False
+        return (now if now is not None else time.time()) >= self.expires_at
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    """
+    Write bytes to a file so that readers never observe a partially written file.
+
+    Args:
+        path: Destination file path
+        data: File content
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class DiskCache:
+    """
+    Size-bounded on-disk cache with per-entry TTL and LRU eviction.
+
+    Entries are kept in a JSON index next to the cached blobs, so the cache
+    survives process restarts. An entry may carry only metadata (no blob), which
+    is how negative results are cached.
+
+    The index is written on every put and delete. Hits only update access times
+    in memory, which are written at most every index_save_interval seconds, so
+    lookups stay cheap; at worst a restart loses some recency information.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int,
+        default_ttl: float | None = None,
+        index_save_interval: float = 60.0,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.index_save_interval = index_save_interval
+        self._index_dirty = False
+        self._index_saved_at = time.monotonic()
+
+        os.makedirs(directory, exist_ok=True)
+        self._index_path = os.path.join(directory, self.INDEX_FILE)
+        self._entries: OrderedDict[str, CacheEntry] = self._load_index()
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, touch=False) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(entry.size for entry in self._entries.values())
+
+    def get(self, key: str, touch: bool = True) -> CacheEntry | None:
+        """
+        Look up a live entry, dropping it if it has expired or its blob is gone.
+
+        Args:
+            key: Cache key
+            touch: Whether to mark the entry as most recently used
+
+        Returns:
+            The cache entry, or None on a miss
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        path = self.path_for(entry)
+        if entry.is_expired() or (path is not None and not os.path.exists(path)):
+            self._remove(key)
+            self._mark_index_dirty()
+            return None
+
+        if touch:
+            entry.accessed_at = time.time()
+            self._entries.move_to_end(key)
+            self._mark_index_dirty()
+
+        return entry
+
+    def put(
+        self,
+        key: str,
+        data: bytes | None = None,
+        meta: dict[str, Any] | None = None,
+        ttl: float | None = None,
+        suffix: str = "",
+    ) -> CacheEntry:
+        """
+        Store an entry, evicting least recently used entries to stay under budget.
+
+        Args:
+            key: Cache key
+            data: Blob content, or None for a metadata-only entry
+            meta: JSON-serializable metadata stored alongside the entry
+            ttl: Seconds until the entry expires (defaults to the cache TTL)
+            suffix: File extension for the blob
+
+        Returns:
+            The stored cache entry
+        """
+        self._remove(key)
+
+        now = time.time()
+        ttl = ttl if ttl is not None else self.default_ttl
+
+        filename = None
+        if data is not None:
+            filename = hashlib.sha256(key.encode("utf-8")).hexdigest() + suffix
+            write_atomic(os.path.join(self.directory, filename), data)
+
+        entry = CacheEntry(
+            key=key,
+            filename=filename,
+            size=len(data) if data is not None else 0,
+            created_at=now,
+            accessed_at=now,
+            expires_at=now + ttl if ttl is not None else None,
+            meta=meta or {},
+        )
+        self._entries[key] = entry
+
+        self._evict()
+        self._save_index()
+        return entry
+
+    def delete(self, key: str) -> None:
+        """Remove an entry and its blob, if present."""
+        if key in self._entries:
+            self._remove(key)
+            self._save_index()
+
+    def flush(self) -> None:
+        """Write the index if access times changed since it was last written."""
+        if self._index_dirty:
+            self._save_index()
+
+    def path_for(self, entry: CacheEntry) -> str | None:
+        """Get the on-disk path of an entry's blob, or None for metadata-only entries."""
+        if entry.filename is None:
+            return None
+        return os.path.join(self.directory, entry.filename)
+
+    def read_bytes(self, entry: CacheEntry) -> bytes:
+        """Read an entry's blob from disk."""
+        path = self.path_for(entry)
+        if path is None:
+            raise ValueError(f"Cache entry {entry.key} has no blob")
+        with open(path, "rb") as f:
+            return f.read()
+
+    def _evict(self) -> None:
+        # The OrderedDict is kept in access order, oldest first.
+        now = time.time()
+        for key in [k for k, e in self._entries.items() if e.is_expired(now)]:
+            self._remove(key)
+
+        total = self.total_bytes
+        while total > self.max_bytes and self._entries:
+            key, entry = next(iter(self._entries.items()))
+            total -= entry.size
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        path = self.path_for(entry)
+        if path is not None and os.path.exists(path):
+            os.remove(path)
+
+    def _load_index(self) -> OrderedDict[str, CacheEntry]:
+        entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        if not os.path.exists(self._index_path):
+            return entries
+
+        try:
+            with open(self._index_path, encoding="utf-8") as f:
+                raw_entries = json.load(f)
+            for raw in sorted(raw_entries, key=lambda e: e["accessed_at"]):
+                entry = CacheEntry(**raw)
+                entries[entry.key] = entry
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            print(f"Ignoring unreadable cache index {self._index_path}: {e}")
+            return OrderedDict()
+
+        return entries
+
+    def _mark_index_dirty(self) -> None:
+        self._index_dirty = True
+        if time.monotonic() - self._index_saved_at >= self.index_save_interval:
+            self._save_index()
+
+    def _save_index(self) -> None:
+        data = json.dumps([asdict(entry) for entry in self._entries.values()])
+        write_atomic(self._index_path, data.encode("utf-8"))
+        self._index_dirty = False
+        self._index_saved_at = time.monotonic()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key onto one in-flight call.
+
+    The first caller for a key starts the call; callers arriving while it runs
+    await the same result (or exception). Once it finishes the key is
+    forgotten, so later calls start afresh (put a cache in front to reuse
+    results). A caller being cancelled doesn't cancel the shared call.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[str, asyncio.Future[Any]] = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._calls
+
+    def start(self, key: str, fn: Callable[[], Awaitable[Any]]) -> asyncio.Future[Any]:
+        """
+        Start fn for key in the background, unless a call is already in flight.
+
+        Args:
+            key: Identity of the call
+            fn: Starts the call; only invoked if none is in flight for key
+
+        Returns:
+            The future of the shared call
+        """
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._calls[key] = future
+            future.add_done_callback(lambda f: self._forget(key, f))
+        return future
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn for key, or join the call already in flight for key.
+
+        Args:
+            key: Identity of the call
+            fn: Starts the call; only invoked if none is in flight for key
+
+        Returns:
+            The result of the shared call
+        """
+        return await asyncio.shield(self.start(key, fn))
+
+    def _forget(self, key: str, future: asyncio.Future[Any]) -> None:
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every caller was cancelled
+        if not future.cancelled():
+            future.exception()
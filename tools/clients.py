@@ -0,0 +1,80 @@
+import asyncio
+import os
+
+import httpx
+from openai import AsyncOpenAI
+
+_http_client: httpx.AsyncClient | None = None
+_openai_client: AsyncOpenAI | None = None
+_client_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _ensure_current_loop() -> None:
+    # httpx connection pools are bound to the event loop they were first used on,
+    # so clients are recreated if a new loop is started (e.g. one loop per test).
+    # The old pool can only be closed on its own loop: it is closed there if
+    # that loop still runs, and close_clients() closes it before a loop ends.
+    global _http_client, _openai_client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client_loop is not loop:
+        if (
+            _http_client is not None
+            and _client_loop is not None
+            and _client_loop.is_running()
+        ):
+            asyncio.run_coroutine_threadsafe(_http_client.aclose(), _client_loop)
+        _http_client = None
+        _openai_client = None
+        _client_loop = loop
+
+
+async def close_clients() -> None:
+    """Close the shared HTTP client (and the OpenAI client using it), e.g. on shutdown."""
+    global _http_client, _openai_client, _client_loop
+    http_client = _http_client
+    _http_client = None
+    _openai_client = None
+    _client_loop = None
+    if http_client is not None:
+        await http_client.aclose()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the process-wide pooled async HTTP client.
+
+    The client keeps connections alive across requests and negotiates HTTP/2
+    where the server supports it. HTTP_MAX_CONNECTIONS (default 50) and
+    HTTP_MAX_KEEPALIVE_CONNECTIONS (default 20) bound the pool.
+
+    Returns:
+        Shared httpx.AsyncClient
+    """
+    global _http_client
+    _ensure_current_loop()
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            timeout=httpx.Timeout(30.0, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "50")),
+                max_keepalive_connections=int(
+                    os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")
+                ),
+            ),
+        )
+    return _http_client
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """
+    Get the process-wide OpenAI client, sharing the pooled HTTP client.
+
+    Returns:
+        Shared AsyncOpenAI client
+    """
+    global _openai_client
+    _ensure_current_loop()
+    if _openai_client is None:
+        _openai_client = AsyncOpenAI(http_client=get_http_client())
+    return _openai_client
@@ -0,0 +1,271 @@
+import base64
+import io
+import json
+import os
+import time
+from typing import Any
+
+from PIL import Image
+
+from utils import get_cache_directory
+
+from .cache import write_atomic
+from .clients import get_openai_client
+
+
+def dhash(image_data: bytes, hash_size: int = 8) -> str:
+    """
+    Compute the difference hash (dHash) of an image.
+
+    The hash is insensitive to scaling, re-encoding and small color changes, so
+    the same avatar served at different sizes or formats hashes (nearly) the same.
+
+    Args:
+        image_data: Encoded image bytes
+        hash_size: Hash width/height in bits (8 gives a 64-bit hash)
+
+    Returns:
+        The hash as a hex string
+    """
+    with Image.open(io.BytesIO(image_data)) as img:
+        small = img.convert("L").resize(
+            (hash_size + 1, hash_size), Image.Resampling.LANCZOS
+        )
+        pixels = small.tobytes()
+
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+
+    return f"{value:0{hash_size * hash_size // 4}x}"
+
+
+def hamming_distance(hash_a: str, hash_b: str) -> int:
+    """Count the differing bits between two hex-encoded hashes."""
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count("1")
+
+
+class DescriptionCache:
+    """
+    Persistent store of image descriptions keyed by perceptual hash.
+
+    Lookups match any stored hash within max_distance bits, so identical or
+    near-identical pictures reuse one description regardless of which handle
+    they were downloaded for. Each hash is split into max_distance + 1 bands:
+    two hashes within max_distance bits agree on at least one band, so only
+    the entries sharing a band with the query are compared.
+
+    The store holds at most max_entries descriptions, evicting the least
+    recently used. It is written on every store; lookups only update hit
+    counts and recency in memory, which are written at most every
+    save_interval seconds or on flush().
+    """
+
+    STORE_FILE = "descriptions.json"
+
+    def __init__(
+        self,
+        directory: str,
+        max_distance: int = 4,
+        max_entries: int = 5000,
+        save_interval: float = 60.0,
+    ):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.save_interval = save_interval
+
+        os.makedirs(directory, exist_ok=True)
+        self._store_path = os.path.join(directory, self.STORE_FILE)
+        self._entries: dict[str, dict[str, Any]] = {}
+        self._bands: dict[tuple[int, int], set[str]] = {}
+        self._stats = {"hits": 0, "misses": 0}
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._load()
+
+    def lookup(self, image_hash: str) -> str | None:
+        """
+        Find the description of the closest stored image within max_distance.
+
+        Args:
+            image_hash: Perceptual hash of the image
+
+        Returns:
+            The stored description, or None on a miss
+        """
+        best_hash = None
+        if image_hash in self._entries:
+            best_hash = image_hash
+        else:
+            candidates: set[str] = set()
+            for band in self._band_keys(image_hash):
+                candidates |= self._bands.get(band, set())
+
+            best_distance = self.max_distance + 1
+            for stored_hash in candidates:
+                distance = hamming_distance(image_hash, stored_hash)
+                if distance < best_distance:
+                    best_hash, best_distance = stored_hash, distance
+
+        if best_hash is None:
+            self._stats["misses"] += 1
+            self._mark_dirty()
+            return None
+
+        # Entries are kept in least recently used first order
+        entry = self._entries.pop(best_hash)
+        self._entries[best_hash] = entry
+        entry["hits"] += 1
+        self._stats["hits"] += 1
+        self._mark_dirty()
+        return entry["description"]
+
+    def store(self, image_hash: str, description: str) -> None:
+        """Store the description of an image, evicting the least recently used."""
+        if self._entries.pop(image_hash, None) is None:
+            self._add_bands(image_hash)
+        self._entries[image_hash] = {
+            "description": description,
+            "hits": 0,
+            "created_at": time.time(),
+        }
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+        self._save()
+
+    def flush(self) -> None:
+        """Write pending hit counts and recency to disk."""
+        if self._dirty:
+            self._save()
+
+    def stats(self) -> dict[str, Any]:
+        """Get hit/miss counts for the store."""
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "entries": len(self._entries),
+            "hits": self._stats["hits"],
+            "misses": self._stats["misses"],
+            "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+        }
+
+    def _band_keys(self, image_hash: str) -> list[tuple[int, int]]:
+        value = int(image_hash, 16)
+        bits = len(image_hash) * 4
+        count = max(1, min(self.max_distance + 1, bits))
+        keys = []
+        for band in range(count):
+            start, end = band * bits // count, (band + 1) * bits // count
+            keys.append((band, (value >> start) & ((1 << (end - start)) - 1)))
+        return keys
+
+    def _add_bands(self, image_hash: str) -> None:
+        for band in self._band_keys(image_hash):
+            self._bands.setdefault(band, set()).add(image_hash)
+
+    def _remove(self, image_hash: str) -> None:
+        del self._entries[image_hash]
+        for band in self._band_keys(image_hash):
+            bucket = self._bands.get(band)
+            if bucket is not None:
+                bucket.discard(image_hash)
+                if not bucket:
+                    del self._bands[band]
+
+    def _mark_dirty(self) -> None:
+        self._dirty = True
+        if time.monotonic() - self._saved_at >= self.save_interval:
+            self._save()
+
+    def _load(self) -> None:
+        if not os.path.exists(self._store_path):
+            return
+
+        try:
+            with open(self._store_path, encoding="utf-8") as f:
+                data = json.load(f)
+            self._entries = data["entries"]
+            self._stats = data["stats"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable description store {self._store_path}: {e}")
+            return
+
+        for image_hash in self._entries:
+            self._add_bands(image_hash)
+
+    def _save(self) -> None:
+        data = json.dumps({"entries": self._entries, "stats": self._stats})
+        write_atomic(self._store_path, data.encode("utf-8"))
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+
+_description_cache: DescriptionCache | None = None
+
+
+def get_description_cache() -> DescriptionCache:
+    """
+    Get the process-wide description cache, creating it on first use.
+
+    DESCRIPTION_CACHE_MAX_DISTANCE (default 4 of 64 bits) controls how different
+    two pictures may be while still sharing a description, and
+    DESCRIPTION_CACHE_MAX_ENTRIES (default 5000) how many descriptions are kept.
+    """
+    global _description_cache
+    if _description_cache is None:
+        _description_cache = DescriptionCache(
+            directory=get_cache_directory("descriptions"),
+            max_distance=int(os.getenv("DESCRIPTION_CACHE_MAX_DISTANCE", "4")),
+            max_entries=int(os.getenv("DESCRIPTION_CACHE_MAX_ENTRIES", "5000")),
+        )
+    return _description_cache
+
+
+async def describe_image(image_data: bytes) -> str:
+    """
+    Describe a picture, reusing the description of any visually identical
+    picture seen before.
+
+    Args:
+        image_data: Encoded image bytes
+
+    Returns:
+        Description of the picture
+    """
+    description_cache = get_description_cache()
+    image_hash = dhash(image_data)
+
+    description = description_cache.lookup(image_hash)
+    if description is not None:
+        print(f"Description cache hit: {description_cache.stats()}")
+        return description
+
+    b64_image = base64.b64encode(image_data).decode("utf-8")
+
+    client = get_openai_client()
+    response = await client.responses.create(
+        model="gpt-4.1",
+        input=[
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "input_text",
+                        "text": "Describe the content of this twitter profile picture.",
+                    },
+                    {
+                        "type": "input_image",
+                        "image_url": f"data:image/png;base64,{b64_image}",
+                    },
+                ],
+            }
+        ],
+    )
+    description = response.output_text
+
+    description_cache.store(image_hash, description)
+    return description
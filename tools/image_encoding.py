@@ -0,0 +1,183 @@
+import io
+import math
+import os
+from dataclasses import dataclass
+
+from PIL import Image, ImageChops, ImageStat
+
+# File extension for each output format
+FORMAT_EXTENSIONS = {"PNG": ".png", "JPEG": ".jpg", "WEBP": ".webp"}
+
+
+@dataclass
+class EncodedImage:
+    data: bytes
+    format: str
+    quality: int | None  # None for lossless formats
+    psnr: float  # inf for lossless formats
+    baseline_bytes: int  # size of the image as a plain PNG
+
+    @property
+    def extension(self) -> str:
+        return FORMAT_EXTENSIONS[self.format]
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.baseline_bytes - len(self.data)
+
+
+def has_alpha(img: Image.Image) -> bool:
+    """Check whether an image has an alpha channel or transparent palette entries."""
+    return img.mode in ("RGBA", "LA", "PA") or (
+        img.mode == "P" and "transparency" in img.info
+    )
+
+
+def psnr(original: Image.Image, encoded: Image.Image) -> float:
+    """
+    Peak signal-to-noise ratio between two RGB images, in dB.
+
+    Around 40 dB differences are hard to see; identical images give inf.
+    """
+    diff = ImageChops.difference(original, encoded)
+    mse = sum(v * v for v in ImageStat.Stat(diff).rms) / 3
+    if mse == 0:
+        return math.inf
+    return 10 * math.log10(255**2 / mse)
+
+
+def _encode(img: Image.Image, image_format: str, quality: int | None) -> bytes:
+    buffer = io.BytesIO()
+    if quality is None:
+        img.save(buffer, format=image_format)
+    elif image_format == "JPEG":
+        img.save(buffer, format="JPEG", quality=quality, optimize=True)
+    else:
+        img.save(buffer, format=image_format, quality=quality)
+    return buffer.getvalue()
+
+
+def _measure(img: Image.Image, image_format: str, quality: int) -> tuple[bytes, float]:
+    data = _encode(img, image_format, quality)
+    with Image.open(io.BytesIO(data)) as decoded:
+        return data, psnr(img, decoded.convert("RGB"))
+
+
+def _lowest_passing_quality(
+    img: Image.Image,
+    image_format: str,
+    min_psnr: float,
+    min_quality: int,
+    max_quality: int,
+) -> tuple[int, bytes, float] | None:
+    # Binary search for the lowest quality meeting the PSNR floor; PSNR grows
+    # (near) monotonically with quality.
+    best = None
+    low, high = min_quality, max_quality
+    while low <= high:
+        quality = (low + high) // 2
+        data, score = _measure(img, image_format, quality)
+        if score >= min_psnr:
+            best = (quality, data, score)
+            high = quality - 1
+        else:
+            low = quality + 1
+    return best
+
+
+def _highest_fitting_quality(
+    img: Image.Image,
+    image_format: str,
+    max_bytes: int,
+    min_quality: int,
+    max_quality: int,
+) -> tuple[int, bytes] | None:
+    # Binary search for the highest quality within the byte budget
+    best = None
+    low, high = min_quality, max_quality
+    while low <= high:
+        quality = (low + high) // 2
+        data = _encode(img, image_format, quality)
+        if len(data) <= max_bytes:
+            best = (quality, data)
+            low = quality + 1
+        else:
+            high = quality - 1
+    return best
+
+
+def encode_for_upload(
+    img: Image.Image,
+    max_bytes: int,
+    min_psnr: float = 40.0,
+    formats: tuple[str, ...] = ("PNG", "WEBP", "JPEG"),
+    min_quality: int = 40,
+    max_quality: int = 95,
+) -> EncodedImage:
+    """
+    Encode an image as small as possible within a quality floor and byte budget.
+
+    Lossy formats are encoded at the lowest quality whose PSNR against the
+    original meets min_psnr, and the smallest result that fits max_bytes wins
+    (lossless PNG counts as meeting any floor). If nothing meets the floor
+    within the budget, the budget wins: the highest-PSNR encoding that fits is
+    used, and failing that the smallest encoding.
+
+    Args:
+        img: Image to encode (converted to RGB)
+        max_bytes: Byte budget for the encoded image
+        min_psnr: Quality floor, as PSNR in dB
+        formats: Candidate formats out of PNG, JPEG and WEBP
+        min_quality: Lowest lossy quality setting to consider
+        max_quality: Highest lossy quality setting to consider
+
+    Returns:
+        The chosen encoding
+    """
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+
+    png = _encode(img, "PNG", None)
+    candidates = []
+    if "PNG" in formats:
+        candidates.append(EncodedImage(png, "PNG", None, math.inf, len(png)))
+
+    for image_format in formats:
+        if image_format == "PNG":
+            continue
+        passing = _lowest_passing_quality(
+            img, image_format, min_psnr, min_quality, max_quality
+        )
+        if passing is not None:
+            quality, data, score = passing
+        else:
+            # Even the best quality misses the floor; keep it as a fallback
+            quality = max_quality
+            data, score = _measure(img, image_format, quality)
+        candidates.append(EncodedImage(data, image_format, quality, score, len(png)))
+
+    in_budget = [c for c in candidates if len(c.data) <= max_bytes]
+    passing_in_budget = [c for c in in_budget if c.psnr >= min_psnr]
+    if passing_in_budget:
+        return min(passing_in_budget, key=lambda c: len(c.data))
+
+    for image_format in formats:
+        if image_format == "PNG":
+            continue
+        fitting = _highest_fitting_quality(
+            img, image_format, max_bytes, min_quality, max_quality
+        )
+        if fitting is not None:
+            quality, data = fitting
+            with Image.open(io.BytesIO(data)) as decoded:
+                score = psnr(img, decoded.convert("RGB"))
+            in_budget.append(EncodedImage(data, image_format, quality, score, len(png)))
+
+    if in_budget:
+        return max(in_budget, key=lambda c: c.psnr)
+    return min(candidates, key=lambda c: len(c.data))
+
+
+def with_extension(path: str, extension: str) -> str:
+    """Replace the extension of a path."""
+    return os.path.splitext(path)[0] + extension
@@ -1,13 +1,27 @@
+import asyncio
 import base64
+import functools
+import io
+import json
 import logging
 import os
 
-import httpx
-import matplotlib.font_manager as fm
 from agents import function_tool
 from PIL import Image, ImageDraw, ImageFont
 
-from utils import get_output_path
+from utils import get_cache_directory, get_output_path
+
+from .cache import DiskCache, SingleFlight
+from .image_encoding import (
+    FORMAT_EXTENSIONS,
+    EncodedImage,
+    encode_for_upload,
+    has_alpha,
+    with_extension,
+)
+from .image_preprocessing import content_hash, prepare_edit_input, source_hash
+from .images_client import get_images_client
+from .media_store import get_media_store
 
 # Configure logging for tool calls only
 tool_logger = logging.getLogger("tool_call")
@@ -23,10 +37,16 @@ if not tool_logger.handlers:
     tool_logger.propagate = False  # Don't pass to root logger
 
 
+WATERMARK_TEXT = "@memery_labs"
+
+
+@functools.lru_cache(maxsize=32)
 def get_font(size: int) -> ImageFont.FreeTypeFont:
     """
     Get font - try bundled Montserrat first, then fallback to bold italic sans-serif.
 
+    Fonts are cached by size, so the font file is loaded once per size.
+
     Args:
         size: Font size in pixels
 
@@ -43,8 +63,11 @@ def get_font(size: int) -> ImageFont.FreeTypeFont:
         except OSError:
             pass
 
-    # Fallback to system bold italic sans-serif
+    # Fallback to system bold italic sans-serif. matplotlib is slow to import,
+    # so it is only loaded when the bundled font is unavailable.
     try:
+        import matplotlib.font_manager as fm
+
         font_path = fm.findfont(
             fm.FontProperties(family="sans-serif", weight="bold", style="italic")
         )
@@ -53,10 +76,74 @@ def get_font(size: int) -> ImageFont.FreeTypeFont:
         return ImageFont.load_default()
 
 
-def add_watermark(image_path: str) -> bool:
+@functools.lru_cache(maxsize=16)
+def _watermark_sprite(
+    image_height: int,
+) -> tuple[Image.Image, tuple[int, int, int, int]]:
+    """
+    Render the watermark text for images of the given height.
+
+    The sprite is drawn from the origin, so pasting it at the text position
+    gives the same result as drawing the text there.
+
+    Returns:
+        The RGBA sprite and the bounding box of the text within it
+    """
+    # Calculate font size to be 1/24 of image height
+    font = get_font(image_height // 24)
+
+    left, top, right, bottom = font.getbbox(WATERMARK_TEXT)
+    text_bbox = (int(left), int(top), int(right), int(bottom))
+    sprite = Image.new("RGBA", (text_bbox[2], text_bbox[3]), (255, 255, 255, 0))
+    ImageDraw.Draw(sprite).text(
+        (0, 0), WATERMARK_TEXT, font=font, fill=(255, 255, 255, 255)
+    )
+    return sprite, text_bbox
+
+
+def watermark_image(img: Image.Image) -> Image.Image:
     """
     Add @memery_labs watermark in white text to the bottom right of an image.
 
+    Only the text's bounding box is composited. RGB images are watermarked in
+    place; other modes are converted to RGB first (transparent areas become
+    white).
+
+    Args:
+        img: Image to watermark
+
+    Returns:
+        Watermarked RGB image
+    """
+    if has_alpha(img):
+        # Flatten onto white (most formats don't support RGBA)
+        rgba = img if img.mode == "RGBA" else img.convert("RGBA")
+        img = Image.new("RGB", rgba.size, (255, 255, 255))
+        img.paste(rgba, mask=rgba.getchannel("A"))
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+
+    sprite, text_bbox = _watermark_sprite(img.height)
+
+    # Get text dimensions
+    text_width = text_bbox[2] - text_bbox[0]
+    text_height = text_bbox[3] - text_bbox[1]
+
+    # Position text in bottom right with padding
+    padding = 20
+    x = img.width - text_width - padding
+    y = img.height - text_height - padding
+
+    # Paint white through the text's alpha, touching only the sprite's box
+    box = (x, y, x + sprite.width, y + sprite.height)
+    img.paste((255, 255, 255), box, mask=sprite.getchannel("A"))
+    return img
+
+
+def add_watermark(image_path: str) -> bool:
+    """
+    Add @memery_labs watermark in white text to the bottom right of an image file.
+
     Args:
         image_path: Path to the image file to watermark
 
@@ -65,73 +152,219 @@ def add_watermark(image_path: str) -> bool:
     """
     try:
         with Image.open(image_path) as img:
-            # Convert to RGBA for transparency support
-            if img.mode != "RGBA":
-                img = img.convert("RGBA")
+            watermark_image(img).save(image_path)
+        tool_logger.info(f"Watermark '@memery_labs' added successfully to {image_path}")
+        return True
+
+    except Exception as e:
+        tool_logger.error(f"Failed to add watermark: {str(e)}")
+        return False
+
+
+# Form fields of every edit request (part of the generation cache key).
+# TODO: lower the moderation level for the image edit API when available.
+EDIT_PARAMS = {
+    "model": "gpt-image-1",
+    "quality": "high",
+    "input_fidelity": "high",
+    "moderation": "low",
+    "size": "1536x1024",
+}
+
+_generation_cache: DiskCache | None = None
+_generation_flight = SingleFlight()
+
+
+def _get_generation_cache() -> DiskCache:
+    """
+    Get the process-wide cache of generated images, creating it on first use.
 
-            # Create a transparent overlay for the text
-            overlay = Image.new("RGBA", img.size, (255, 255, 255, 0))
-            draw = ImageDraw.Draw(overlay)
+    Entries expire after GENERATION_CACHE_TTL seconds (default one week) and
+    are evicted (LRU) once the cache grows past GENERATION_CACHE_MAX_MB
+    megabytes (default 500).
+    """
+    global _generation_cache
+    if _generation_cache is None:
+        _generation_cache = DiskCache(
+            directory=get_cache_directory("generations"),
+            max_bytes=int(float(os.getenv("GENERATION_CACHE_MAX_MB", "500")) * 1024**2),
+            default_ttl=float(os.getenv("GENERATION_CACHE_TTL", str(7 * 24 * 60 * 60))),
+        )
+    return _generation_cache
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize case, whitespace and trailing punctuation of a prompt."""
+    return " ".join(prompt.casefold().split()).rstrip(" .!")
+
+
+def generation_cache_key(
+    prompt: str, image_paths: list[str], image_data: list[bytes | None] | None = None
+) -> str:
+    """
+    Build the generation cache key for a request.
 
-            # Watermark text
-            watermark_text = "@memery_labs"
+    The key covers the exact prompt sent to the model, which names the input
+    files (and so the users they belong to), plus the content of the inputs.
+    Identical pictures of different users therefore never share an entry.
 
-            # Calculate font size to be 1/24 of image height
-            font_size = img.height // 24
+    Args:
+        prompt: Full prompt sent to the edit API
+        image_paths: Paths of the input images, in order
+        image_data: Content of each input held in memory, or None for inputs
+            read from disk
 
-            # Get font using our cross-platform function
-            font = get_font(font_size)
+    Returns:
+        Cache key
+    """
+    if image_data is None:
+        image_data = [None] * len(image_paths)
+    key = json.dumps(
+        {
+            "prompt": normalize_prompt(prompt),
+            "images": [
+                source_hash(path, data)[0]
+                for path, data in zip(image_paths, image_data, strict=True)
+            ],
+            "params": EDIT_PARAMS,
+            "watermark": WATERMARK_TEXT,
+        },
+        sort_keys=True,
+    )
+    return "generation:" + content_hash(key.encode("utf-8"))
 
-            # Get text dimensions
-            text_bbox = draw.textbbox((0, 0), watermark_text, font=font)
-            text_width = text_bbox[2] - text_bbox[0]
-            text_height = text_bbox[3] - text_bbox[1]
 
-            # Position text in bottom right with padding
-            padding = 20
-            x = img.width - text_width - padding
-            y = img.height - text_height - padding
+async def _generate_and_cache(
+    cache_key: str,
+    prompt: str,
+    image_paths: list[str],
+    image_data: list[bytes | None] | None = None,
+) -> EncodedImage | None:
+    encoded = await _generate_composite_image(prompt, image_paths, image_data)
+    if encoded is not None:
+        _get_generation_cache().put(
+            cache_key,
+            encoded.data,
+            meta={"format": encoded.format},
+            suffix=encoded.extension,
+        )
+    return encoded
 
-            # Draw the watermark text in white (no background)
-            draw.text((x, y), watermark_text, font=font, fill=(255, 255, 255, 255))
 
-            # Composite the overlay onto the original image
-            watermarked = Image.alpha_composite(img, overlay)
+async def _generate_composite_image(
+    prompt: str, image_paths: list[str], image_data: list[bytes | None] | None = None
+) -> EncodedImage | None:
+    """
+    Call the image edit API, then watermark and encode the result.
 
-            # Convert back to RGB for saving (most formats don't support RGBA)
-            if watermarked.mode == "RGBA":
-                rgb_img = Image.new("RGB", watermarked.size, (255, 255, 255))
-                rgb_img.paste(watermarked, mask=watermarked.split()[-1])
-                watermarked = rgb_img
+    Args:
+        prompt: Full prompt for the edit API
+        image_paths: Paths of the input images
+        image_data: Content of each input held in memory, or None for inputs
+            read from disk
 
-            watermarked.save(image_path)
+    Returns:
+        The encoded image, or None if generation failed
+    """
+    # Upload downscaled, metadata-free copies; repeat inputs such as the meme
+    # assets are served from the preprocessing cache. The prepared bytes are
+    # uploaded from memory, so a cache eviction can't remove them mid-request.
+    if image_data is None:
+        image_data = [None] * len(image_paths)
+    uploads: list[str | tuple[str, bytes]] = []
+    for path, data in zip(image_paths, image_data, strict=True):
+        try:
+            prepared = await asyncio.to_thread(prepare_edit_input, path, data)
             tool_logger.info(
-                f"Watermark '@memery_labs' added successfully to {image_path}"
+                f"Prepared {path}: {prepared.width}x{prepared.height} "
+                f"{prepared.format}, {prepared.prepared_bytes} bytes"
             )
-            return True
+            uploads.append((prepared.path, prepared.data))
+        except Exception as e:
+            tool_logger.warning(f"Failed to preprocess {path}, sending as is: {e}")
+            uploads.append((path, data) if data is not None else path)
+
+    try:
+        tool_logger.info("Sending request to OpenAI API...")
+        response = await get_images_client().edit(prompt, uploads, **EDIT_PARAMS)
+
+        if response.status_code == 200:
+            tool_logger.info("API request successful")
+            result = response.json()
+
+            # Extract and decode base64 image
+            if "data" in result and len(result["data"]) > 0:
+                tool_logger.info("Extracting image data from response")
+                b64_image = result["data"][0]["b64_json"]
+                generated = base64.b64decode(b64_image)
+
+                # Watermark and encode in memory, so the image is decoded and
+                # encoded once and never read back from disk.
+                with Image.open(io.BytesIO(generated)) as img:
+                    img.load()
+                    try:
+                        img = watermark_image(img)
+                        tool_logger.info("Watermark added to composite image")
+                    except Exception as e:
+                        tool_logger.warning(
+                            f"Failed to add watermark to composite image: {e}"
+                        )
+
+                    encoded = await asyncio.to_thread(
+                        encode_for_upload,
+                        img,
+                        max_bytes=int(os.getenv("IMAGE_MAX_BYTES", "5000000")),
+                        min_psnr=float(os.getenv("IMAGE_MIN_PSNR", "40")),
+                    )
+
+                tool_logger.info(
+                    f"Encoded as {encoded.format} (quality {encoded.quality}, "
+                    f"PSNR {encoded.psnr:.1f} dB): {len(encoded.data)} bytes, "
+                    f"{encoded.bytes_saved} bytes saved over PNG"
+                )
+                return encoded
+            else:
+                tool_logger.error("No image data in API response")
+                print("Error: No image data in response")
+                return None
+        else:
+            tool_logger.error(f"API request failed with status {response.status_code}")
+            tool_logger.error(f"Response: {response.text}")
+            print(f"Error: API request failed with status {response.status_code}")
+            print(f"Response: {response.text}")
+            return None
 
     except Exception as e:
-        tool_logger.error(f"Failed to add watermark: {str(e)}")
-        return False
+        tool_logger.error(f"Exception occurred: {str(e)}")
+        print(f"Error: {str(e)}")
+        return None
 
 
 async def _create_composite_image_impl(
     prompt: str,
     image_paths: list[str],
     output_file: str = "output.png",
-) -> bool:
+) -> str | None:
     """
     Create a composite image using OpenAI's image editing API.
 
+    The image is encoded in whichever of PNG, WebP and JPEG is smallest while
+    meeting IMAGE_MIN_PSNR (default 40 dB) and IMAGE_MAX_BYTES (default 5 MB,
+    Twitter's image upload limit), so the extension of the saved file may
+    differ from output_file's.
+
+    Results are cached by the normalized prompt sent to the model and the
+    input image content, and concurrent identical requests share one
+    generation.
+
     Args:
         prompt: Text description of how to combine the images
         image_paths: List of paths to image files
         output_file: Output filename for the generated image
 
     Returns:
-        True if successful, False otherwise
+        Path the image was saved to if successful, None otherwise
     """
-
     # Provide context on what images the agent is seeing (based on the file path).
     prompt = f"The images you are seeing are {', '.join(image_paths)}. " + prompt
 
@@ -147,81 +380,49 @@ async def _create_composite_image_impl(
     tool_logger.info(f"Input images: {image_paths}")
     tool_logger.info(f"Output file: {output_file}")
 
-    # Verify all image files exist
+    # Verify all image files exist (generated images may only be held in memory)
+    media_store = get_media_store()
     for path in image_paths:
-        if not os.path.exists(path):
+        if not media_store.exists(path):
             tool_logger.error(f"Image file not found: {path}")
-            return False
+            return None
         tool_logger.info(
-            f"Found image file: {path} (size: {os.path.getsize(path)} bytes)"
+            f"Found image file: {path} (size: {media_store.size(path)} bytes)"
         )
 
-    files = [("image[]", open(path, "rb")) for path in image_paths]
-
-    try:
-        tool_logger.info("Sending request to OpenAI API...")
-        async with httpx.AsyncClient(timeout=180) as client:
-            try:
-                response = await client.post(
-                    "https://api.openai.com/v1/images/edits",
-                    headers={"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}"},
-                    # TODO: lower the moderation level for the image edit API when available.
-                    data={
-                        "model": "gpt-image-1",
-                        "prompt": prompt,
-                        "quality": "high",
-                        "input_fidelity": "high",
-                        "moderation": "low",
-                        "size": "1536x1024",
-                    },
-                    files=files,
-                )
-            except Exception:
-                import traceback
-
-                traceback.print_exc()
-
-        if response.status_code == 200:
-            tool_logger.info("API request successful")
-            result = response.json()
+    # Read inputs held in memory here: the media store belongs to the event
+    # loop, while hashing and preprocessing run in worker threads.
+    image_data = [media_store.get(path) for path in image_paths]
 
-            # Extract and decode base64 image
-            if "data" in result and len(result["data"]) > 0:
-                tool_logger.info("Extracting image data from response")
-                b64_image = result["data"][0]["b64_json"]
-                image_data = base64.b64decode(b64_image)
-
-                # Save the image
-                with open(output_file, "wb") as f:
-                    f.write(image_data)
-
-                tool_logger.info(
-                    f"Composite image successfully saved to: {output_file}"
-                )
+    cache = _get_generation_cache()
+    cache_key = await asyncio.to_thread(
+        generation_cache_key, prompt, image_paths, image_data
+    )
+    entry = cache.get(cache_key)
+    if entry is not None:
+        tool_logger.info(f"Generation cache hit for {cache_key}")
+        data = cache.read_bytes(entry)
+        extension = FORMAT_EXTENSIONS[entry.meta["format"]]
+    else:
+        if cache_key in _generation_flight:
+            tool_logger.info("Joining identical generation already in progress")
+        encoded = await _generation_flight.do(
+            cache_key,
+            lambda: _generate_and_cache(cache_key, prompt, image_paths, image_data),
+        )
+        if encoded is None:
+            return None
+        data, extension = encoded.data, encoded.extension
 
-                # Add watermark to the generated image
-                if add_watermark(output_file):
-                    tool_logger.info("Watermark added to composite image")
-                else:
-                    tool_logger.warning("Failed to add watermark to composite image")
+    # Keep the image in memory for the upload; it is archived to output_file
+    # in the background.
+    output_file = with_extension(output_file, extension)
+    media_store.put(output_file, data)
 
-                print(f"Image saved to: {output_file}")
-                return True
-            else:
-                tool_logger.error("No image data in API response")
-                print("Error: No image data in response")
-                return False
-        else:
-            tool_logger.error(f"API request failed with status {response.status_code}")
-            tool_logger.error(f"Response: {response.text}")
-            print(f"Error: API request failed with status {response.status_code}")
-            print(f"Response: {response.text}")
-            return False
+    tool_logger.info(f"Composite image successfully saved to: {output_file}")
 
-    except Exception as e:
-        tool_logger.error(f"Exception occurred: {str(e)}")
-        print(f"Error: {str(e)}")
-        return False
+    print(f"Image saved to: {output_file}")
+    return output_file
 
 
 @function_tool
@@ -242,5 +443,5 @@ async def create_composite_image(
         Full path to the generated image if successful, empty string if failed
     """
     output_path = get_output_path(output_filename)
-    success = await _create_composite_image_impl(prompt, image_paths, output_path)
-    return output_path if success else ""
+    saved_path = await _create_composite_image_impl(prompt, image_paths, output_path)
+    return saved_path or ""
@@ -0,0 +1,222 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from PIL import Image, ImageOps
+
+from utils import get_cache_directory
+
+from .cache import DiskCache
+from .image_encoding import FORMAT_EXTENSIONS, encode_for_upload, has_alpha
+
+logger = logging.getLogger(__name__)
+
+# The edit endpoint works at up to 1536px on the long side (we request
+# 1536x1024), so larger inputs are only downscaled server side.
+EDIT_INPUT_MAX_SIZE = 1536
+
+# Per-image upload limit of the edit endpoint
+EDIT_INPUT_MAX_BYTES = 50 * 1024**2
+
+
+@dataclass
+class PreparedImage:
+    path: str  # preprocessed file in the cache
+    width: int
+    height: int
+    format: str
+    source_bytes: int
+    prepared_bytes: int
+    # The encoded image, held so a later cache eviction can't pull it from
+    # under an upload
+    data: bytes = field(repr=False)
+
+
+def content_hash(data: bytes) -> str:
+    """SHA-256 hex digest of file content."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def normalize_for_edit(
+    data: bytes, max_size: int = EDIT_INPUT_MAX_SIZE, min_psnr: float = 45.0
+) -> tuple[bytes, str, tuple[int, int]]:
+    """
+    Downscale, re-encode and strip the metadata of an edit input image.
+
+    EXIF orientation is applied before the metadata is dropped. Images with
+    transparency stay lossless PNG; opaque images use the smallest encoding
+    meeting the min_psnr quality floor.
+
+    Args:
+        data: Encoded source image
+        max_size: Longest side of the output, in pixels
+        min_psnr: Quality floor for lossy re-encoding, as PSNR in dB
+
+    Returns:
+        The encoded image, its format and its (width, height)
+    """
+    with Image.open(io.BytesIO(data)) as source:
+        img = ImageOps.exif_transpose(source)
+        img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+
+        if has_alpha(img):
+            img = img.convert("RGBA")
+            img.info = {}
+            buffer = io.BytesIO()
+            img.save(buffer, format="PNG", optimize=True)
+            return buffer.getvalue(), "PNG", img.size
+
+        img = img.convert("RGB")
+        img.info = {}
+        encoded = encode_for_upload(
+            img, max_bytes=EDIT_INPUT_MAX_BYTES, min_psnr=min_psnr
+        )
+        return encoded.data, encoded.format, img.size
+
+
+_preprocess_cache: DiskCache | None = None
+# Inputs are prepared in worker threads; the cache index isn't thread-safe.
+_preprocess_lock = threading.Lock()
+
+# Content hashes of files on disk as (mtime, size, hash) by path, so unchanged
+# inputs such as the meme assets are only read and hashed once. Keeps the
+# FILE_HASHES_MAX_ITEMS most recently used paths.
+FILE_HASHES_MAX_ITEMS = 1024
+_file_hashes: OrderedDict[str, tuple[int, int, str]] = OrderedDict()
+
+
+def _get_preprocess_cache() -> DiskCache:
+    """
+    Get the process-wide cache of preprocessed edit inputs, creating it on first use.
+
+    Entries are keyed by the content hash of the source image, so they never go
+    stale and are only evicted (LRU) once the cache grows past
+    PREPROCESS_CACHE_MAX_MB megabytes (default 200).
+    """
+    global _preprocess_cache
+    if _preprocess_cache is None:
+        _preprocess_cache = DiskCache(
+            directory=get_cache_directory("edit_inputs"),
+            max_bytes=int(float(os.getenv("PREPROCESS_CACHE_MAX_MB", "200")) * 1024**2),
+        )
+    return _preprocess_cache
+
+
+def source_hash(path: str, data: bytes | None = None) -> tuple[str, bytes | None]:
+    """
+    Get the content hash of an image, given its content or its file on disk.
+
+    Args:
+        path: Image path
+        data: Content of the image if it is held in memory (e.g. read from the
+            media store on the event loop)
+
+    Returns:
+        The SHA-256 of the content, plus the content if it was given or read
+    """
+    if data is not None:
+        return content_hash(data), data
+
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    with _preprocess_lock:
+        cached = _file_hashes.get(path)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            _file_hashes.move_to_end(path)
+            return cached[2], None
+
+    with open(path, "rb") as f:
+        data = f.read()
+    image_hash = content_hash(data)
+    with _preprocess_lock:
+        _file_hashes[path] = (stat.st_mtime_ns, stat.st_size, image_hash)
+        _file_hashes.move_to_end(path)
+        while len(_file_hashes) > FILE_HASHES_MAX_ITEMS:
+            _file_hashes.popitem(last=False)
+    return image_hash, data
+
+
+def prepare_edit_input(
+    path: str,
+    data: bytes | None = None,
+    max_size: int | None = None,
+    min_psnr: float | None = None,
+) -> PreparedImage:
+    """
+    Get the preprocessed version of an edit input, preparing it on a cache miss.
+
+    Args:
+        path: Source image
+        data: Content of the source image if it is held in memory; read from
+            path otherwise
+        max_size: Longest side of the output, in pixels (default
+            EDIT_INPUT_MAX_SIZE, overridable with EDIT_INPUT_MAX_SIZE)
+        min_psnr: Quality floor for lossy re-encoding (default 45 dB,
+            overridable with EDIT_INPUT_MIN_PSNR)
+
+    Returns:
+        The preprocessed image, including its encoded bytes
+    """
+    if max_size is None:
+        max_size = int(os.getenv("EDIT_INPUT_MAX_SIZE", str(EDIT_INPUT_MAX_SIZE)))
+    if min_psnr is None:
+        min_psnr = float(os.getenv("EDIT_INPUT_MIN_PSNR", "45"))
+
+    image_hash, data = source_hash(path, data)
+    key = f"edit-input:{image_hash}:{max_size}:{min_psnr}"
+
+    with _preprocess_lock:
+        cache = _get_preprocess_cache()
+        entry = cache.get(key)
+        # Read the bytes under the lock, before another put can evict them
+        try:
+            prepared = cache.read_bytes(entry) if entry is not None else None
+        except (OSError, ValueError):
+            prepared = None
+    if entry is not None and prepared is not None:
+        return PreparedImage(
+            path=cache.path_for(entry),  # type: ignore[arg-type]
+            width=entry.meta["width"],
+            height=entry.meta["height"],
+            format=entry.meta["format"],
+            source_bytes=entry.meta["source_bytes"],
+            prepared_bytes=len(prepared),
+            data=prepared,
+        )
+
+    if data is None:
+        with open(path, "rb") as f:
+            data = f.read()
+    prepared, image_format, (width, height) = normalize_for_edit(
+        data, max_size, min_psnr
+    )
+    with _preprocess_lock:
+        entry = cache.put(
+            key,
+            prepared,
+            meta={
+                "width": width,
+                "height": height,
+                "format": image_format,
+                "source_bytes": len(data),
+            },
+            suffix=FORMAT_EXTENSIONS[image_format],
+        )
+    logger.info(
+        f"Preprocessed {path}: {len(data)} -> {len(prepared)} bytes, "
+        f"{width}x{height} {image_format}"
+    )
+
+    return PreparedImage(
+        path=cache.path_for(entry),  # type: ignore[arg-type]
+        width=width,
+        height=height,
+        format=image_format,
+        source_bytes=len(data),
+        prepared_bytes=len(prepared),
+        data=prepared,
+    )
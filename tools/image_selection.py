@@ -1,8 +1,14 @@
 from agents import function_tool
 
+from .meme_assets import get_meme_asset_index
+
 
 def _select_local_image_impl(meme: str) -> str:
-    return f"memes/{meme}/default.jpg"
+    asset = get_meme_asset_index().get(meme)
+    if asset is None:
+        print(f"No local image for meme: {meme}")
+        return ""
+    return asset.path
 
 
 @function_tool
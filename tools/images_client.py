@@ -0,0 +1,163 @@
+import asyncio
+import email.utils
+import logging
+import mimetypes
+import os
+import random
+import time
+from contextlib import ExitStack
+from typing import IO, Any
+
+import httpx
+
+from .clients import get_http_client
+from .media_store import get_media_store
+
+logger = logging.getLogger(__name__)
+
+IMAGES_EDITS_URL = "https://api.openai.com/v1/images/edits"
+
+# Rate limits and transient server errors are worth retrying
+RETRY_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def retry_delay(
+    attempt: int,
+    response: httpx.Response | None = None,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+) -> float:
+    """
+    Get the delay before retrying a request.
+
+    A Retry-After header (seconds or an HTTP date) is honored when present;
+    otherwise the delay is exponential backoff with full jitter.
+
+    Args:
+        attempt: Number of the attempt that failed, starting from 0
+        response: The failed response, if the server sent one
+        base_delay: Backoff delay of the first retry, in seconds
+        max_delay: Upper bound on the delay, in seconds
+
+    Returns:
+        Seconds to wait before the next attempt
+    """
+    retry_after = response.headers.get("retry-after") if response else None
+    if retry_after:
+        try:
+            return min(float(retry_after), max_delay)
+        except ValueError:
+            try:
+                retry_at = email.utils.parsedate_to_datetime(retry_after).timestamp()
+                return min(max(retry_at - time.time(), 0.0), max_delay)
+            except (TypeError, ValueError):
+                pass
+
+    return random.uniform(0, min(max_delay, base_delay * 2**attempt))
+
+
+class ImagesClient:
+    """
+    Client for the OpenAI images API on the shared, pooled HTTP client.
+
+    Requests that fail with a rate limit, a transient server error or a
+    network error are retried with backoff. Input files are streamed into
+    the multipart body and always closed when the request finishes.
+    """
+
+    def __init__(self, max_retries: int = 3, timeout: float = 180):
+        self.max_retries = max_retries
+        self.timeout = timeout
+
+    async def edit(
+        self, prompt: str, images: list[str | tuple[str, bytes]], **params: Any
+    ) -> httpx.Response:
+        """
+        Call the image edit endpoint.
+
+        Args:
+            prompt: Edit prompt
+            images: Input images, as paths (generated images held in the media
+                store are sent from memory) or (filename, bytes) pairs
+            **params: Other form fields, e.g. model, quality and size
+
+        Returns:
+            The final response, which may still be an error response once the
+            retries are used up
+
+        Raises:
+            httpx.TransportError: If the last attempt failed without a response
+        """
+        with ExitStack() as stack:
+            files = [("image[]", self._input_file(image, stack)) for image in images]
+            response = await self._post(
+                IMAGES_EDITS_URL, data={"prompt": prompt, **params}, files=files
+            )
+        return response
+
+    @staticmethod
+    def _input_file(
+        image: str | tuple[str, bytes], stack: ExitStack
+    ) -> tuple[str, IO[bytes] | bytes, str]:
+        data: bytes | None
+        if isinstance(image, tuple):
+            path, data = image
+        else:
+            path, data = image, get_media_store().get(image)
+        content: IO[bytes] | bytes
+        if data is not None:
+            content = data
+        else:
+            content = stack.enter_context(open(path, "rb"))
+        return (
+            os.path.basename(path),
+            content,
+            mimetypes.guess_type(path)[0] or "application/octet-stream",
+        )
+
+    async def _post(self, url: str, **kwargs: Any) -> httpx.Response:
+        headers = {"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}"}
+        for attempt in range(self.max_retries + 1):
+            is_last_attempt = attempt == self.max_retries
+            try:
+                response = await get_http_client().post(
+                    url, headers=headers, timeout=self.timeout, **kwargs
+                )
+            except httpx.TransportError as e:
+                if is_last_attempt:
+                    raise
+                delay = retry_delay(attempt)
+                logger.warning(
+                    f"Images request failed ({e!r}), retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+                continue
+
+            if response.status_code not in RETRY_STATUS_CODES or is_last_attempt:
+                return response
+
+            delay = retry_delay(attempt, response)
+            logger.warning(
+                f"Images request returned {response.status_code}, "
+                f"retrying in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+
+        raise AssertionError("unreachable")
+
+
+_images_client: ImagesClient | None = None
+
+
+def get_images_client() -> ImagesClient:
+    """
+    Get the process-wide images client.
+
+    OPENAI_IMAGES_MAX_RETRIES (default 3) bounds the retries per request.
+    """
+    global _images_client
+    if _images_client is None:
+        _images_client = ImagesClient(
+            max_retries=int(os.getenv("OPENAI_IMAGES_MAX_RETRIES", "3"))
+        )
+    return _images_client
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+
+from .cache import write_atomic
+
+logger = logging.getLogger(__name__)
+
+
+class MediaStore:
+    """
+    In-memory store of generated media, keyed by the path it is published under.
+
+    Tools hand the agent a file path as before, but the encoded bytes stay in
+    memory so the next pipeline stage (another edit, video generation, the
+    upload) doesn't have to read them back from disk. Copies are written to
+    the path in the background when archiving is enabled. The store keeps the
+    max_items most recently used entries.
+    """
+
+    def __init__(self, max_items: int = 32, archive: bool = True):
+        self.max_items = max_items
+        self.archive = archive
+        self._items: OrderedDict[str, bytes] = OrderedDict()
+        self._pending_writes: set[asyncio.Future[None]] = set()
+
+    def put(self, path: str, data: bytes) -> None:
+        """
+        Store media under a path, archiving it to disk in the background.
+
+        Args:
+            path: Path the media is published under
+            data: Encoded media bytes
+        """
+        self._items[path] = data
+        self._items.move_to_end(path)
+        while len(self._items) > self.max_items:
+            evicted, _ = self._items.popitem(last=False)
+            if not self.archive:
+                logger.warning(f"Evicted unarchived media {evicted} from memory")
+
+        if self.archive:
+            self._write_behind(path, data)
+
+    def get(self, path: str) -> bytes | None:
+        """Get media from memory, or None if it isn't held in memory."""
+        data = self._items.get(path)
+        if data is not None:
+            self._items.move_to_end(path)
+        return data
+
+    def read(self, path: str) -> bytes:
+        """Get media from memory, falling back to reading the file at path."""
+        data = self.get(path)
+        if data is None:
+            with open(path, "rb") as f:
+                data = f.read()
+        return data
+
+    def exists(self, path: str) -> bool:
+        """Check whether media is held in memory or exists on disk."""
+        return path in self._items or os.path.exists(path)
+
+    def size(self, path: str) -> int:
+        """Size of the media in bytes."""
+        data = self.get(path)
+        return len(data) if data is not None else os.path.getsize(path)
+
+    def discard(self, path: str) -> None:
+        """Drop media from memory once it is no longer needed."""
+        self._items.pop(path, None)
+
+    async def flush(self) -> None:
+        """Wait for pending archive writes to finish."""
+        if self._pending_writes:
+            await asyncio.gather(*self._pending_writes, return_exceptions=True)
+
+    def _write_behind(self, path: str, data: bytes) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (e.g. scripts): write synchronously
+            write_atomic(path, data)
+            return
+
+        future = loop.run_in_executor(None, write_atomic, path, data)
+        self._pending_writes.add(future)
+        future.add_done_callback(lambda f: self._finish_write(path, f))
+
+    def _finish_write(self, path: str, future: asyncio.Future[None]) -> None:
+        self._pending_writes.discard(future)
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Failed to archive {path}: {future.exception()}")
+
+
+_media_store: MediaStore | None = None
+
+
+def get_media_store() -> MediaStore:
+    """
+    Get the process-wide media store, creating it on first use.
+
+    MEDIA_STORE_MAX_ITEMS (default 32) bounds how many files are held in memory,
+    and MEDIA_ARCHIVE=false turns off writing generated media to disk.
+    """
+    global _media_store
+    if _media_store is None:
+        _media_store = MediaStore(
+            max_items=int(os.getenv("MEDIA_STORE_MAX_ITEMS", "32")),
+            archive=os.getenv("MEDIA_ARCHIVE", "true").lower() != "false",
+        )
+    return _media_store
@@ -0,0 +1,209 @@
+import asyncio
+import io
+import logging
+import os
+import time
+from dataclasses import dataclass
+
+from PIL import Image
+
+from .cache import SingleFlight
+from .description_cache import describe_image
+from .image_preprocessing import PreparedImage, content_hash, prepare_edit_input
+
+logger = logging.getLogger(__name__)
+
+# Classic meme characters and the twitter handles whose profile pictures show them.
+CLASSIC_MEMES = {
+    "hosico": "@Hosico_on_sol",
+    "200m": "@the200m_bonk",
+    "crybaby": "@Crybaby_on_sol",
+    "bonk": "@bonk_inu",
+}
+
+ASSET_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+@dataclass
+class MemeAsset:
+    name: str
+    path: str
+    width: int
+    height: int
+    content_hash: str
+    mtime_ns: int
+    size: int
+    prepared: PreparedImage | None = None  # preprocessed edit input
+    description: str | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self.prepared is not None and self.description is not None
+
+
+def _find_asset_file(directory: str) -> str | None:
+    for extension in ASSET_EXTENSIONS:
+        path = os.path.join(directory, "default" + extension)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+class MemeAssetIndex:
+    """
+    In-memory index of the local meme assets under memes/{name}/default.*.
+
+    Each asset carries its dimensions, content hash, preprocessed edit input
+    and a description, so classic memes resolve without any network call. The
+    directory is rescanned at most every refresh_interval seconds, and only
+    assets whose file changed (by mtime and size) are reloaded.
+    """
+
+    def __init__(self, memes_dir: str = "memes", refresh_interval: float = 30.0):
+        self.memes_dir = memes_dir
+        self.refresh_interval = refresh_interval
+        self._assets: dict[str, MemeAsset] = {}
+        self._last_refresh: float | None = None
+        self._loading = SingleFlight()
+
+    def refresh(self, force: bool = False) -> None:
+        """
+        Rescan the memes directory, reloading assets whose file changed.
+
+        Args:
+            force: Rescan even if the last scan is recent
+        """
+        now = time.monotonic()
+        if (
+            not force
+            and self._last_refresh is not None
+            and now - self._last_refresh < self.refresh_interval
+        ):
+            return
+        self._last_refresh = now
+
+        assets: dict[str, MemeAsset] = {}
+        try:
+            entries = sorted(os.scandir(self.memes_dir), key=lambda e: e.name)
+        except OSError:
+            entries = []
+
+        for entry in entries:
+            if not entry.is_dir():
+                continue
+            path = _find_asset_file(entry.path)
+            if path is None:
+                continue
+
+            try:
+                stat = os.stat(path)
+                asset = self._assets.get(entry.name.lower())
+                if (
+                    asset is None
+                    or asset.path != path
+                    or asset.mtime_ns != stat.st_mtime_ns
+                    or asset.size != stat.st_size
+                ):
+                    asset = self._load(entry.name, path, stat)
+                assets[entry.name.lower()] = asset
+            except Exception as e:
+                logger.warning(f"Skipping unreadable meme asset {path}: {e}")
+
+        self._assets = assets
+
+    def names(self) -> list[str]:
+        """Get the names of the available meme characters, sorted."""
+        self.refresh()
+        return list(self._assets)
+
+    def get(self, name: str) -> MemeAsset | None:
+        """Get an asset by meme name (case-insensitive)."""
+        self.refresh()
+        return self._assets.get(name.lower())
+
+    def for_handle(self, handle: str) -> MemeAsset | None:
+        """
+        Get the local asset of a classic meme by its twitter handle.
+
+        Args:
+            handle: Twitter handle, with or without @
+
+        Returns:
+            The asset, or None if the handle isn't a classic meme with a local asset
+        """
+        handle = handle.lstrip("@").lower()
+        for name, meme_handle in CLASSIC_MEMES.items():
+            if meme_handle.lstrip("@").lower() == handle:
+                return self.get(name)
+        return None
+
+    async def ensure_ready(self, asset: MemeAsset) -> MemeAsset:
+        """
+        Fill in the preprocessed input and description of an asset if missing.
+
+        Descriptions come from the persistent description cache, so the vision
+        model is only called the first time an asset is seen.
+
+        Args:
+            asset: Asset to prepare
+
+        Returns:
+            The same asset
+        """
+        if not asset.ready:
+            await self._loading.do(
+                f"{asset.name}:{asset.content_hash}", lambda: self._prepare(asset)
+            )
+        return asset
+
+    async def warm(self) -> None:
+        """Scan the memes directory and prepare every asset."""
+        self.refresh(force=True)
+        for asset in list(self._assets.values()):
+            try:
+                await self.ensure_ready(asset)
+            except Exception as e:
+                logger.warning(f"Failed to prepare meme asset {asset.path}: {e}")
+
+    async def _prepare(self, asset: MemeAsset) -> None:
+        if asset.prepared is None:
+            asset.prepared = await asyncio.to_thread(prepare_edit_input, asset.path)
+        if asset.description is None:
+            with open(asset.path, "rb") as f:
+                asset.description = await describe_image(f.read())
+
+    @staticmethod
+    def _load(name: str, path: str, stat: os.stat_result) -> MemeAsset:
+        with open(path, "rb") as f:
+            data = f.read()
+        with Image.open(io.BytesIO(data)) as img:
+            width, height = img.size
+
+        return MemeAsset(
+            name=name.lower(),
+            path=path,
+            width=width,
+            height=height,
+            content_hash=content_hash(data),
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+        )
+
+
+_meme_asset_index: MemeAssetIndex | None = None
+
+
+def get_meme_asset_index() -> MemeAssetIndex:
+    """
+    Get the process-wide meme asset index, creating it on first use.
+
+    MEMES_DIR (default memes) sets the asset directory, and
+    MEME_INDEX_REFRESH_SECONDS (default 30) how often it is checked for changes.
+    """
+    global _meme_asset_index
+    if _meme_asset_index is None:
+        _meme_asset_index = MemeAssetIndex(
+            memes_dir=os.getenv("MEMES_DIR", "memes"),
+            refresh_interval=float(os.getenv("MEME_INDEX_REFRESH_SECONDS", "30")),
+        )
+    return _meme_asset_index
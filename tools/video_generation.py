@@ -1,15 +1,22 @@
+import asyncio
+import io
 import logging
+import mimetypes
 import os
 import time
 import uuid
+from dataclasses import dataclass, field
 
 from agents import function_tool
 from dotenv import load_dotenv
 from google import genai
-from google.genai.types import Image
+from google.genai.types import GenerateVideosOperation, Image
+from PIL import Image as PILImage
 
 from utils import get_video_output_path
 
+from .media_store import get_media_store
+
 load_dotenv()
 
 # Configure logging for tool calls only
@@ -26,6 +33,170 @@ if not tool_logger.handlers:
     tool_logger.propagate = False  # Don't pass to root logger
 
 
+@dataclass
+class _TrackedOperation:
+    operation: GenerateVideosOperation
+    future: asyncio.Future[GenerateVideosOperation]
+    deadline: float
+    interval: float
+    next_poll_at: float = field(default_factory=time.monotonic)
+
+
+class VideoOperationTracker:
+    """
+    Tracks any number of in-flight Veo operations from a single polling task.
+
+    Each operation is polled with its own adaptive backoff, starting at
+    initial_interval seconds and growing by backoff up to max_interval, and the
+    future returned by wait() resolves once the operation is done. Operations
+    that are not done within timeout seconds fail with TimeoutError.
+    """
+
+    def __init__(
+        self,
+        client: genai.Client,
+        initial_interval: float = 5.0,
+        max_interval: float = 20.0,
+        backoff: float = 1.5,
+        timeout: float = 300.0,
+    ):
+        self.client = client
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self._operations: dict[str, _TrackedOperation] = {}
+        self._wakeup = asyncio.Event()
+        self._poller: asyncio.Task[None] | None = None
+
+    def __len__(self) -> int:
+        return len(self._operations)
+
+    async def wait(self, operation: GenerateVideosOperation) -> GenerateVideosOperation:
+        """
+        Wait for an operation to finish without blocking the event loop.
+
+        Args:
+            operation: Operation returned by generate_videos
+
+        Returns:
+            The finished operation
+        """
+        if operation.done:
+            return operation
+
+        future: asyncio.Future[GenerateVideosOperation] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._operations[str(operation.name)] = _TrackedOperation(
+            operation=operation,
+            future=future,
+            deadline=time.monotonic() + self.timeout,
+            interval=self.initial_interval,
+            next_poll_at=time.monotonic() + self.initial_interval,
+        )
+
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.create_task(self._poll_forever())
+        self._wakeup.set()
+
+        return await future
+
+    async def _poll_forever(self) -> None:
+        while self._operations:
+            now = time.monotonic()
+            due = [
+                tracked
+                for tracked in self._operations.values()
+                if tracked.next_poll_at <= now
+            ]
+            await asyncio.gather(*(self._poll(tracked) for tracked in due))
+
+            if not self._operations:
+                break
+
+            # Sleep until the next operation is due, or a new one is added.
+            next_poll_at = min(t.next_poll_at for t in self._operations.values())
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), max(0.0, next_poll_at - time.monotonic())
+                )
+            except TimeoutError:
+                pass
+
+    async def _poll(self, tracked: _TrackedOperation) -> None:
+        name = str(tracked.operation.name)
+        try:
+            await self._update(tracked, name)
+        except Exception as e:
+            # Fail only this operation's waiter; the shared poller keeps running
+            # for the others.
+            tool_logger.error(f"Failed to track video operation {name}: {e}")
+            self._operations.pop(name, None)
+            if not tracked.future.done():
+                tracked.future.set_exception(e)
+
+    async def _update(self, tracked: _TrackedOperation, name: str) -> None:
+        try:
+            tracked.operation = await self.client.aio.operations.get(tracked.operation)
+        except Exception as e:
+            tool_logger.warning(f"Failed to poll video operation {name}: {e}")
+
+        if tracked.operation.done:
+            self._operations.pop(name, None)
+            if not tracked.future.done():
+                tracked.future.set_result(tracked.operation)
+        elif time.monotonic() >= tracked.deadline:
+            self._operations.pop(name, None)
+            if not tracked.future.done():
+                tracked.future.set_exception(
+                    TimeoutError(f"Video operation {name} timed out")
+                )
+        else:
+            tracked.interval = min(tracked.interval * self.backoff, self.max_interval)
+            tracked.next_poll_at = time.monotonic() + tracked.interval
+            tool_logger.info(
+                f"Video operation {name} still running "
+                f"({len(self._operations)} in flight), next check in "
+                f"{tracked.interval:.0f}s"
+            )
+
+
+_tracker: VideoOperationTracker | None = None
+_tracker_loop: asyncio.AbstractEventLoop | None = None
+
+
+def get_video_operation_tracker() -> VideoOperationTracker:
+    """
+    Get the video operation tracker for the running event loop.
+
+    VEO_POLL_TIMEOUT sets how long (in seconds, default 300) an operation may
+    run before it is given up on.
+    """
+    global _tracker, _tracker_loop
+    loop = asyncio.get_running_loop()
+    if _tracker is None or _tracker_loop is not loop:
+        _tracker = VideoOperationTracker(
+            genai.Client(), timeout=float(os.getenv("VEO_POLL_TIMEOUT", "300"))
+        )
+        _tracker_loop = loop
+    return _tracker
+
+
+def _load_veo_image(image_bytes: bytes, image_path: str) -> Image:
+    # Veo takes PNG or JPEG input; other formats (e.g. WebP from the image
+    # encoder) are converted to PNG.
+    mime_type = mimetypes.guess_type(image_path)[0]
+    if mime_type not in ("image/png", "image/jpeg"):
+        with PILImage.open(io.BytesIO(image_bytes)) as img:
+            buffer = io.BytesIO()
+            img.convert("RGB").save(buffer, format="PNG")
+        image_bytes, mime_type = buffer.getvalue(), "image/png"
+    return Image(image_bytes=image_bytes, mime_type=mime_type)
+
+
 async def _image_to_video_generation_impl(
     image_path: str,
     output_file: str = "output_video.mp4",
@@ -46,42 +217,34 @@ async def _image_to_video_generation_impl(
     tool_logger.info(f"Input image: {image_path}")
     tool_logger.info(f"Output file: {output_file}")
 
-    # Verify the image file exists
-    if not os.path.exists(image_path):
+    # Verify the image file exists (generated images may only be held in memory)
+    media_store = get_media_store()
+    if not media_store.exists(image_path):
         tool_logger.error(f"Image file not found: {image_path}")
         return False
 
     tool_logger.info(
-        f"Found image file: {image_path} (size: {os.path.getsize(image_path)} bytes)"
+        f"Found image file: {image_path} (size: {media_store.size(image_path)} bytes)"
     )
 
     try:
-        tool_logger.info("Initializing video gen client...")
-        client = genai.Client()
+        tracker = get_video_operation_tracker()
+        client = tracker.client
 
         tool_logger.info("Sending video generation request to Veo 3...")
 
         # Generate video with Veo 3 from an image
-        operation = client.models.generate_videos(
+        operation = await client.aio.models.generate_videos(
             model="veo-3.0-fast-generate-001",
-            image=Image.from_file(location=image_path),
+            image=_load_veo_image(media_store.read(image_path), image_path),
         )
 
         tool_logger.info(f"Video generation operation started: {operation.name}")
 
-        # Poll the operation status until the video is ready
-        max_attempts = 30  # Wait up to 5 minutes (10 second intervals)
-        attempt = 0
-
-        while not operation.done and attempt < max_attempts:
-            attempt += 1
-            tool_logger.info(
-                f"Waiting for video generation to complete... (attempt {attempt}/{max_attempts})"
-            )
-            time.sleep(10)
-            operation = client.operations.get(operation)
-
-        if not operation.done:
+        # Wait for the video without blocking other work on the event loop
+        try:
+            operation = await tracker.wait(operation)
+        except TimeoutError:
             tool_logger.error("Video generation timed out")
             return False
 
@@ -94,7 +257,7 @@ async def _image_to_video_generation_impl(
         video = operation.response.generated_videos[0]
 
         # Download the file content
-        client.files.download(file=video.video)
+        await client.aio.files.download(file=video.video)
 
         # Save the video to the specified output file
         video.video.save(output_file)
@@ -1,12 +1,20 @@
-import base64
+import asyncio
+import functools
 import os
+from collections.abc import Awaitable
 from dataclasses import dataclass
 from urllib.parse import urlparse
 
-import requests
+import httpx
 from agents import function_tool
 from dotenv import load_dotenv
-from openai import AsyncOpenAI
+
+from utils import get_cache_directory
+
+from .cache import DiskCache, SingleFlight, write_atomic
+from .clients import get_http_client
+from .description_cache import describe_image
+from .meme_assets import get_meme_asset_index
 
 
 @dataclass
@@ -15,6 +23,221 @@ class ProfilePicture:
     description: str | None
 
 
+_profile_cache: DiskCache | None = None
+
+
+def _get_profile_cache() -> DiskCache:
+    """
+    Get the process-wide profile picture cache, creating it on first use.
+
+    Username lookups expire after PROFILE_CACHE_TTL seconds (default one day), and
+    handles that don't exist are remembered for PROFILE_CACHE_NEGATIVE_TTL seconds
+    (default one hour). Images are keyed by their resolved URL, which changes
+    whenever the user uploads a new picture, so they are only evicted (LRU) once
+    the cache grows past PROFILE_CACHE_MAX_MB megabytes (default 200).
+    """
+    global _profile_cache
+    if _profile_cache is None:
+        _profile_cache = DiskCache(
+            directory=get_cache_directory("profile_pics"),
+            max_bytes=int(float(os.getenv("PROFILE_CACHE_MAX_MB", "200")) * 1024**2),
+        )
+    return _profile_cache
+
+
+def _profile_cache_ttl() -> tuple[float, float]:
+    """Get the (positive, negative) TTLs in seconds for username lookups."""
+    ttl = float(os.getenv("PROFILE_CACHE_TTL", str(24 * 60 * 60)))
+    negative_ttl = float(os.getenv("PROFILE_CACHE_NEGATIVE_TTL", str(60 * 60)))
+    return ttl, negative_ttl
+
+
+def _twitter_headers() -> dict[str, str]:
+    """Get the headers for Twitter API v2 app-only requests."""
+    load_dotenv()
+
+    bearer_token = os.getenv("TWITTER_BEARER_TOKEN")
+    if not bearer_token:
+        raise ValueError("TWITTER_BEARER_TOKEN not found in environment variables")
+
+    return {
+        "Authorization": f"Bearer {bearer_token}",
+        "Content-Type": "application/json",
+    }
+
+
+async def _resolve_profile_image_urls(usernames: list[str]) -> dict[str, str | None]:
+    """
+    Resolve the full size profile image URLs of several X users.
+
+    Cached lookups are served from the profile cache; the rest are resolved with
+    as few batched users/by requests (up to 100 usernames each) as possible.
+
+    Args:
+        usernames: X usernames (without @)
+
+    Returns:
+        Mapping from lowercased username to image URL, or None if the user
+        doesn't exist
+    """
+    cache = _get_profile_cache()
+    ttl, negative_ttl = _profile_cache_ttl()
+
+    resolved: dict[str, str | None] = {}
+    pending: list[str] = []
+    for username in dict.fromkeys(u.lower() for u in usernames):
+        entry = cache.get(f"user:{username}")
+        if entry is None:
+            pending.append(username)
+        elif entry.meta.get("missing"):
+            resolved[username] = None
+        else:
+            resolved[username] = entry.meta["profile_image_url"].replace("_normal", "")
+
+    if not pending:
+        return resolved
+
+    headers = _twitter_headers()
+    http_client = get_http_client()
+
+    for i in range(0, len(pending), 100):
+        batch = pending[i : i + 100]
+        response = await http_client.get(
+            "https://api.twitter.com/2/users/by",
+            headers=headers,
+            params={"usernames": ",".join(batch), "user.fields": "profile_image_url"},
+        )
+        response.raise_for_status()
+
+        found = {
+            user["username"].lower(): user["profile_image_url"]
+            for user in response.json().get("data", [])
+        }
+
+        for username in batch:
+            profile_image_url = found.get(username)
+            if profile_image_url is None:
+                print(f"User {username} not found")
+                cache.put(f"user:{username}", meta={"missing": True}, ttl=negative_ttl)
+                resolved[username] = None
+            else:
+                cache.put(
+                    f"user:{username}",
+                    meta={"profile_image_url": profile_image_url},
+                    ttl=ttl,
+                )
+                # Get the full size image URL (remove _normal)
+                resolved[username] = profile_image_url.replace("_normal", "")
+
+    return resolved
+
+
+async def _fetch_profile_image(full_size_url: str) -> bytes:
+    """
+    Get a profile image, downloading it unless we already have this exact picture.
+
+    Args:
+        full_size_url: URL of the full size profile image
+
+    Returns:
+        Encoded image bytes
+    """
+    cache = _get_profile_cache()
+    image_key = f"image:{full_size_url}"
+
+    image_entry = cache.get(image_key)
+    if image_entry is not None:
+        return cache.read_bytes(image_entry)
+
+    img_response = await get_http_client().get(full_size_url)
+    img_response.raise_for_status()
+
+    file_extension = os.path.splitext(urlparse(full_size_url).path)[1] or ".jpg"
+    cache.put(image_key, img_response.content, suffix=file_extension)
+    return img_response.content
+
+
+@dataclass
+class _ProfileContent:
+    full_size_url: str
+    image_data: bytes
+    description: str
+
+
+# In-flight fetches (speculative or requested), keyed by lowercased username.
+_profile_flight = SingleFlight()
+
+
+async def _fetch_profile_content(
+    username: str,
+    resolution: Awaitable[dict[str, str | None]] | None = None,
+) -> _ProfileContent | None:
+    """
+    Resolve, download and describe the profile picture of an X user.
+
+    Args:
+        username: X username (without @)
+        resolution: Pending batched URL resolution that includes this user; the
+            user is resolved on their own if not given
+
+    Returns:
+        The picture and its description, or None if the user doesn't exist
+    """
+    if resolution is None:
+        resolution = _resolve_profile_image_urls([username])
+    full_size_url = (await resolution)[username.lower()]
+    if full_size_url is None:
+        return None
+
+    image_data = await _fetch_profile_image(full_size_url)
+
+    # describe the content of the image so that the agent
+    # has sufficient context when generating the prompt.
+    description = await describe_image(image_data)
+
+    return _ProfileContent(full_size_url, image_data, description)
+
+
+def start_profile_prefetch(usernames: list[str]) -> None:
+    """
+    Start resolving, downloading and describing the profile pictures of several X
+    users in the background.
+
+    The users are resolved with one batched lookup and their pictures are fetched
+    and described concurrently, overlapping with whatever the caller does next
+    (typically the agent's planning turn). A download_x_profile_picture call for
+    one of these users awaits the running fetch instead of starting its own.
+
+    Args:
+        usernames: X usernames (without @)
+    """
+    meme_assets = get_meme_asset_index()
+    pending = [
+        username
+        for username in dict.fromkeys(u.lower() for u in usernames)
+        if username not in _profile_flight and meme_assets.for_handle(username) is None
+    ]
+    if not pending:
+        return
+
+    resolution = asyncio.ensure_future(_resolve_profile_image_urls(pending))
+    for username in pending:
+        future = _profile_flight.start(
+            username, functools.partial(_fetch_profile_content, username, resolution)
+        )
+        future.add_done_callback(functools.partial(_finish_prefetch, username))
+
+    print(f"Prefetching profile pictures: {pending}")
+
+
+def _finish_prefetch(
+    username: str, future: asyncio.Future[_ProfileContent | None]
+) -> None:
+    # Once done, the picture and description are served from the caches.
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Profile picture prefetch failed for @{username}: {future.exception()}")
+
+
 async def _download_x_profile_picture_impl(
     username: str,
     output_dir: str = "profile_pics",
@@ -29,85 +252,47 @@ async def _download_x_profile_picture_impl(
     Returns:
         str: Path to the downloaded image file, or None if failed
     """
-    load_dotenv()
+    # Classic memes with a local asset resolve without any network call
+    asset = get_meme_asset_index().for_handle(username)
+    if asset is not None:
+        try:
+            await get_meme_asset_index().ensure_ready(asset)
+            print(f"Using local meme asset for @{username}: {asset.path}")
+            return ProfilePicture(filepath=asset.path, description=asset.description)
+        except Exception as e:
+            print(f"Failed to prepare local meme asset {asset.path}: {e}")
 
-    bearer_token = os.getenv("TWITTER_BEARER_TOKEN")
-    if not bearer_token:
-        raise ValueError("TWITTER_BEARER_TOKEN not found in environment variables")
+    # Fail early on missing credentials, even if the lookup would be cached
+    _twitter_headers()
 
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
 
-    # Headers for Twitter API v2
-    headers = {
-        "Authorization": f"Bearer {bearer_token}",
-        "Content-Type": "application/json",
-    }
-
     try:
-        # Get user info including profile image URL
-        user_url = f"https://api.twitter.com/2/users/by/username/{username}"
-        params = {"user.fields": "profile_image_url"}
-
-        response = requests.get(user_url, headers=headers, params=params)
-        response.raise_for_status()
-
-        user_data = response.json()
-
-        if "data" not in user_data:
-            print(f"User {username} not found")
+        # Concurrent calls for the same user (including a running prefetch)
+        # share one resolution, download and description.
+        content = await _profile_flight.do(
+            username.lower(), functools.partial(_fetch_profile_content, username)
+        )
+        if content is None:
             return ProfilePicture(filepath=None, description=None)
 
-        # Get the profile image URL (remove _normal to get full size)
-        profile_image_url = user_data["data"]["profile_image_url"]
-        full_size_url = profile_image_url.replace("_normal", "")
-
-        # Download the image
-        img_response = requests.get(full_size_url)
-        img_response.raise_for_status()
-
         # Determine file extension from URL
-        parsed_url = urlparse(full_size_url)
+        parsed_url = urlparse(content.full_size_url)
         file_extension = os.path.splitext(parsed_url.path)[1] or ".jpg"
 
         # Save the image
         filename = f"{username}_profile{file_extension}"
         filepath = os.path.join(output_dir, filename)
 
-        with open(filepath, "wb") as f:
-            f.write(img_response.content)
+        # Other runs may be reading or writing this path concurrently
+        write_atomic(filepath, content.image_data)
 
         print(f"Profile picture downloaded: {filepath}")
 
-        # describe the content of the image so that the agent
-        # has sufficient context when generating the prompt.
-        with open(filepath, "rb") as image_file:
-            b64_image = base64.b64encode(image_file.read()).decode("utf-8")
-
-        client = AsyncOpenAI()
-        response = await client.responses.create(
-            model="gpt-4.1",
-            input=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "input_text",
-                            "text": f"Describe the content of this twitter profile picture of @{username}.",
-                        },
-                        {
-                            "type": "input_image",
-                            "image_url": f"data:image/png;base64,{b64_image}",
-                        },
-                    ],
-                }
-            ],
-        )
-        description = response.output_text  # type: ignore[attr-defined]
-
-        return ProfilePicture(filepath=filepath, description=description)
+        return ProfilePicture(filepath=filepath, description=content.description)
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"API request failed: {e}")
         return ProfilePicture(filepath=None, description=None)
     except Exception as e:
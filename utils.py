@@ -1,5 +1,8 @@
 import os
-from pathlib import Path
+import re
+
+# X usernames are 1-15 ASCII letters, digits or underscores; "@café" is not one.
+HANDLE_PATTERN = re.compile(r"(?<![\w@])@([A-Za-z0-9_]{1,15})(?!\w)")
 
 
 def build_prompt_from_tweet(tweet: str, author_username: str, me_username: str) -> str:
@@ -18,28 +21,57 @@ def build_prompt_from_tweet(tweet: str, author_username: str, me_username: str)
     return prompt
 
 
-def get_available_characters(memes_dir: str = "memes") -> list[str]:
+def extract_handles_from_tweet(
+    tweet: str,
+    me_username: str,
+    classic_memes: dict[str, str] | None = None,
+) -> list[str]:
     """
-    Discover available meme characters by scanning the memes directory.
+    Find the X handles whose profile pictures a tweet is likely to need.
 
     Args:
-        memes_dir: Path to the memes directory (relative to project root)
+        tweet: Tweet text
+        me_username: The bot's own username, which is never returned
+        classic_memes: Mapping from classic meme keywords to their twitter handles
 
     Returns:
-        List of character names (directory names in memes folder)
+        Usernames (without @), tagged handles first, without duplicates
     """
-    try:
-        memes_path = Path(memes_dir)
+    handles = HANDLE_PATTERN.findall(tweet)
+
+    for keyword, handle in (classic_memes or {}).items():
+        if re.search(rf"\b{re.escape(keyword)}\b", tweet, re.IGNORECASE):
+            handles.append(handle.lstrip("@"))
+
+    unique_handles: dict[str, str] = {}
+    for handle in handles:
+        if handle.lower() != me_username.lower():
+            unique_handles.setdefault(handle.lower(), handle)
+
+    return list(unique_handles.values())
 
-        if not memes_path.exists():
-            return []
 
-        characters = []
-        for item in memes_path.iterdir():
-            if item.is_dir():
-                characters.append(item.name)
+def get_available_characters(memes_dir: str = "memes") -> list[str]:
+    """
+    List the available meme characters from the meme asset index.
+
+    The index rescans the memes directory at most every
+    MEME_INDEX_REFRESH_SECONDS, so this is cheap to call per request.
+
+    Args:
+        memes_dir: Path to the memes directory (relative to project root)
+
+    Returns:
+        Sorted list of character names (directories in memes with a default image)
+    """
+    # Imported here: the tools package itself imports utils.
+    from tools.meme_assets import MemeAssetIndex, get_meme_asset_index
 
-        return sorted(characters)
+    try:
+        index = get_meme_asset_index()
+        if os.path.abspath(memes_dir) != os.path.abspath(index.memes_dir):
+            index = MemeAssetIndex(memes_dir)
+        return index.names()
     except Exception as e:
         print(f"Error scanning memes directory: {e}")
         return []
@@ -111,3 +143,19 @@ def get_video_output_path(filename: str) -> str:
     if not output_dir.startswith("/app"):
         os.makedirs(output_dir, exist_ok=True)
     return os.path.join(output_dir, filename)
+
+
+def get_cache_directory(name: str) -> str:
+    """
+    Get the directory for a named on-disk cache based on environment.
+
+    Args:
+        name: Name of the cache (used as the subdirectory name)
+
+    Returns:
+        Cache directory path
+    """
+    base_dir = os.getenv("CACHE_DIR") or os.path.join(
+        os.getenv("RAILWAY_VOLUME_MOUNT_PATH", "."), "cache"
+    )
+    return os.path.join(base_dir, name)